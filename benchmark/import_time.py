@@ -0,0 +1,41 @@
+"""
+Import-time benchmark for tmp_name. Every measurement runs in a fresh
+interpreter. Exits with a non-zero status if a heavy dependency is pulled in
+at import time or if the import exceeds the time limit (seconds).
+
+    python benchmark/import_time.py [limit]
+"""
+import sys
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SNIPPET = """
+import sys, time
+t0 = time.perf_counter()
+{stmt}
+t1 = time.perf_counter()
+print(t1 - t0, *[m for m in ("tqdm", "pandas") if m in sys.modules])
+"""
+
+
+def measure(stmt, repeat=5):
+    times = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", SNIPPET.format(stmt=stmt)],
+                             cwd=ROOT, capture_output=True, text=True, check=True)
+        t, *heavy = out.stdout.split()
+        times.append(float(t))
+    return min(times), heavy
+
+
+if __name__ == "__main__":
+    limit = float(sys.argv[1]) if len(sys.argv) > 1 else 0.5
+    failed = False
+    for stmt in ("import tmp_name", "from tmp_name import TmpName"):
+        t, heavy = measure(stmt)
+        print(f"{stmt:<32}{1000 * t:8.2f} ms", *heavy)
+        if heavy or t > limit:
+            failed = True
+    sys.exit(failed)
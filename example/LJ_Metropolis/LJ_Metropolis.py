@@ -3,13 +3,15 @@ from tmp_name.sampler import Metropolis
 from tmp_name.moves import Trans, TransMH
 from tmp_name.initposition import FCC
 from tmp_name.initvelocity import Temperature
+from tmp_name.minimizer import FIRE
 
 tn = TmpName("test", FCC(4, 10, 3), Temperature(1.4))
 tn.snapshot("initial.xyz")
 
 tn.dump(1, "dump.xyz", 'x', 'y', 'z')
 
-# relax with molecular dynamics
+# relax structure, then equilibrate with molecular dynamics
+tn.minimize(FIRE(ftol=1e-4))
 tn.thermo(1, "md.log", 'step', 'time', 'poteng', 'kineng')
 tn.run_md(steps=100)
 tn.snapshot("after_md.xyz")
@@ -1 +1,26 @@
-from .core import TmpName
+"""
+Submodules and the TmpName class are imported on first access, so that
+'import tmp_name' stays cheap for short scripted jobs.
+"""
+from importlib import import_module
+
+__all__ = ["TmpName"]
+
+_submodules = ("core", "dump", "thermo", "forcefield", "integrator",
+               "sampler", "moves", "initposition", "initvelocity",
+               "cluster", "particles", "umbrella", "analysis", "energy",
+               "minimizer", "domain", "schedule", "progress")
+
+
+def __getattr__(name):
+    if name == "TmpName":
+        from .core import TmpName
+        globals()["TmpName"] = TmpName
+        return TmpName
+    if name in _submodules:
+        return import_module("." + name, __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__ + list(_submodules))
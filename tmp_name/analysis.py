@@ -0,0 +1,183 @@
+import numpy as np
+from math import gamma, pi
+
+
+class Analysis:
+    """
+    Analysis base class. The analysis is sampled every freq steps
+    during run_md, and the results are written to file every nwrite
+    samples.
+    """
+    def __init__(self, freq, file, nwrite=100):
+        self.freq = freq
+        self.file = file
+        self.nwrite = nwrite
+        self.nsamples = 0
+
+    def __call__(self, solver):
+        if solver.t % self.freq == 0:
+            self.sample(solver)
+            self.nsamples += 1
+            if self.nsamples % self.nwrite == 0:
+                self.write()
+
+    def sample(self, solver):
+        raise NotImplementedError("Class {} has no instance 'sample'."
+                                  .format(self.__class__.__name__))
+
+    def write(self):
+        raise NotImplementedError("Class {} has no instance 'write'."
+                                  .format(self.__class__.__name__))
+
+
+class RDF(Analysis):
+    """
+    Radial distribution function. When rmax does not exceed the force
+    field cutoff of any pair type, the pair distances computed by the
+    force field in the same step are reused.
+
+    rmax : float
+        largest distance, force field cutoff by default
+    nbins : int
+        number of bins
+    volume : float
+        volume of system. If not given, the local density rho*g(r)
+        is written instead of g(r)
+    """
+    def __init__(self, freq, file, rmax=None, nbins=100, volume=None, nwrite=100):
+        super().__init__(freq, file, nwrite)
+        self.rmax = rmax
+        self.nbins = nbins
+        self.volume = volume
+        self.counts = np.zeros(nbins)
+        self.npar = 0
+
+    def pair_distances(self, solver):
+        ff = solver.forcefield
+        if self.rmax is None:
+            self.rmax = ff.cutoff
+        # the force field keeps the pairs within their own cutoff only
+        if self.rmax**2 <= ff.cutoff2.min() and getattr(ff, 'distanceSqrd', None) is not None:
+            return np.sqrt(ff.distanceSqrd)
+        upperTri = np.triu_indices(solver.npar, 1)
+        dr = solver.r[upperTri[0]] - solver.r[upperTri[1]]
+        return np.sqrt(np.einsum('ij,ij->i', dr, dr))
+
+    def sample(self, solver):
+        distance = self.pair_distances(solver)
+        self.counts += np.histogram(distance, bins=self.nbins, range=(0, self.rmax))[0]
+        self.npar += solver.npar
+        self.ndim = solver.ndim
+
+    def write(self):
+        edges = np.linspace(0, self.rmax, self.nbins + 1)
+        r = (edges[1:] + edges[:-1]) / 2
+        unit = pi**(self.ndim / 2) / gamma(self.ndim / 2 + 1)
+        shell = unit * (edges[1:]**self.ndim - edges[:-1]**self.ndim)
+        # every pair is counted once, so twice per particle
+        g = 2 * self.counts / (self.npar * shell)
+        if self.volume is not None:
+            g /= self.npar / (self.nsamples * self.volume)
+        np.savetxt(self.file, np.column_stack((r, g)), header="r g", comments='')
+
+
+class MultipleTau(Analysis):
+    """
+    Multiple-tau correlator (Ramirez et al., 2010). Level l holds the
+    last p samples averaged over blocks of m**l samples, so lags up to
+    p * m**(levels-1) are covered in bounded memory. Subclasses define
+    the correlation of two (stacks of) configurations.
+
+    p : int
+        number of points per level
+    m : int
+        number of samples averaged to the next level
+    levels : int
+        number of levels
+    """
+    def __init__(self, freq, file, p=16, m=2, levels=16, nwrite=100):
+        super().__init__(freq, file, nwrite)
+        self.p = p
+        self.m = m
+        self.levels = levels
+        self.buffer = None
+        self.size = np.zeros(levels, dtype=int)
+        self.nsum = np.zeros(levels, dtype=int)
+        self.corr = np.zeros((levels, p))
+        self.ncorr = np.zeros((levels, p), dtype=int)
+
+    def add(self, x, level):
+        """
+        Add sample to level, correlate with all stored samples
+        and pass block averages on to the next level
+        """
+        buffer = self.buffer[level]
+        buffer[1:] = buffer[:-1].copy()
+        buffer[0] = x
+        n = min(self.size[level] + 1, self.p)
+        self.size[level] = n
+        self.corr[level, :n] += self.correlate(x, buffer[:n])
+        self.ncorr[level, :n] += 1
+
+        self.accum[level] += x
+        self.nsum[level] += 1
+        if self.nsum[level] == self.m and level + 1 < self.levels:
+            self.add(self.accum[level] / self.m, level + 1)
+            self.accum[level] = 0
+            self.nsum[level] = 0
+
+    def sample(self, solver):
+        x = self.quantity(solver)
+        if self.buffer is None:
+            self.buffer = np.zeros((self.levels, self.p) + x.shape)
+            self.accum = np.zeros((self.levels,) + x.shape)
+            self.dt = solver.integrator.dt * self.freq
+        self.add(x, 0)
+
+    def results(self):
+        """
+        Lags and correlations of all levels, without duplicated lags
+        """
+        lag, corr = [], []
+        for level in range(self.levels):
+            start = 0 if level == 0 else self.p // self.m
+            j = np.arange(start, self.p)
+            filled = self.ncorr[level, j] > 0
+            lag.append(j[filled] * self.m**level)
+            corr.append(self.corr[level, j[filled]] / self.ncorr[level, j[filled]])
+        return np.concatenate(lag) * self.dt, np.concatenate(corr)
+
+
+class MSD(MultipleTau):
+    """
+    Mean-square displacement. The positions are never wrapped into a
+    periodic box in this code, so they are used as unwrapped coordinates.
+    """
+    @staticmethod
+    def quantity(solver):
+        return solver.r.copy()
+
+    @staticmethod
+    def correlate(x, buffer):
+        return np.sum((buffer - x)**2, axis=(1, 2)) / len(x)
+
+    def write(self):
+        lag, msd = self.results()
+        np.savetxt(self.file, np.column_stack((lag, msd)), header="time msd", comments='')
+
+
+class VACF(MultipleTau):
+    """
+    Velocity autocorrelation function, normalized by the mean of v(0)**2
+    """
+    @staticmethod
+    def quantity(solver):
+        return solver.v.copy()
+
+    @staticmethod
+    def correlate(x, buffer):
+        return np.einsum('ijk,jk->i', buffer, x) / len(x)
+
+    def write(self):
+        lag, vacf = self.results()
+        np.savetxt(self.file, np.column_stack((lag, vacf / vacf[0])), header="time vacf", comments='')
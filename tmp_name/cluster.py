@@ -0,0 +1,221 @@
+import numpy as np
+from collections import deque
+
+
+class Cluster:
+    """
+    Cluster identification using union-find over a neighbor list. Two
+    particles are bonded if they are closer than rc, and a cluster is a
+    connected set of bonded particles (Stillinger criterion). After a
+    single-particle move, insertion or deletion, the neighbor list and
+    the union-find structure are updated incrementally.
+
+    rc : float
+        bond length of the Stillinger criterion
+    """
+    def __init__(self, rc):
+        self.rc = rc
+        self.rc2 = rc * rc
+        self.proposal = None
+        self.stale = True
+
+    def build(self, r):
+        """
+        Build neighbor list and union-find structure from scratch
+        """
+        npar = len(r)
+        dr = r[:, np.newaxis, :] - r[np.newaxis, :, :]
+        distanceSqrd = np.einsum('ijk,ijk->ij', dr, dr)
+        upperTri = np.triu_indices(npar, 1)
+        bonded = distanceSqrd[upperTri] < self.rc2
+        self.nbrs = [set() for _ in range(npar)]
+        for i, j in zip(upperTri[0][bonded], upperTri[1][bonded]):
+            self.nbrs[i].add(j)
+            self.nbrs[j].add(i)
+        self.stale = False
+        self.proposal = None
+        self.unite_all()
+
+    def unite_all(self):
+        """
+        Recompute the union-find structure from the neighbor list
+        """
+        npar = len(self.nbrs)
+        self.parent = list(range(npar))
+        self.size = [1] * npar
+        for i, nbrs in enumerate(self.nbrs):
+            for j in nbrs:
+                if j > i:
+                    self.union(i, j)
+        self.dirty = False
+
+    def invalidate(self):
+        """
+        Mark the structure as outdated, for instance after all particles
+        have been moved by an integrator. It is rebuilt on next query.
+        """
+        self.stale = True
+
+    def find(self, i):
+        """
+        Find root of particle i, with path halving
+        """
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, i, j):
+        """
+        Merge the clusters of particle i and j, union by size
+        """
+        i, j = self.find(i), self.find(j)
+        if i == j:
+            return
+        if self.size[i] < self.size[j]:
+            i, j = j, i
+        self.parent[j] = i
+        self.size[i] += self.size[j]
+
+    def neighbors(self, r, i):
+        """
+        Find all particles bonded to particle i
+        """
+        dr = r - r[i]
+        distanceSqrd = np.einsum('ij,ij->i', dr, dr)
+        distanceSqrd[i] = np.inf
+        return set(np.nonzero(distanceSqrd < self.rc2)[0])
+
+    def breaks(self, r, i, old=None, delete=False):
+        """
+        Check if particle i, at its new position in r, has broken its
+        cluster into several pieces. Only the bonds lost by the move can
+        split the cluster, so a breadth-first search from i stops as soon
+        as all previous neighbors are reached again. old is the position
+        of i before the move, needed to rebuild an outdated structure.
+        If delete is set, particle i is to be deleted, and its neighbors
+        have to stay connected without it.
+        """
+        if self.stale:
+            r_old = r
+            if old is not None:
+                r_old = r.copy()
+                r_old[i] = old
+            self.build(r_old)
+        new = set() if delete else self.neighbors(r, i)
+        lost = self.nbrs[i] - new
+        remaining = set(lost)
+        visited = {i} | new
+        queue = deque(new)
+        if delete and lost:
+            j = next(iter(lost))
+            visited.add(j)
+            queue.append(j)
+        while queue and remaining:
+            j = queue.popleft()
+            remaining.discard(j)
+            for k in self.nbrs[j]:
+                if k not in visited and k != i:
+                    visited.add(k)
+                    queue.append(k)
+        self.proposal = (i, new, lost, not remaining)
+        return bool(remaining)
+
+    def isolates(self, r, i):
+        """
+        Check if particle i, appended to r by an insertion, has no bonds
+        and would thus form a cluster of its own
+        """
+        if self.stale:
+            self.build(r[:i])
+        new = self.neighbors(r, i)
+        self.proposal = (i, new, set(), True)
+        return i > 0 and not new
+
+    def insert(self, r, i):
+        """
+        Add particle i, appended to r, to neighbor list and clusters
+        """
+        if self.stale:
+            self.build(r)
+            return
+        if self.proposal is not None and self.proposal[0] == i:
+            new = self.proposal[1]
+        else:
+            new = self.neighbors(r, i)
+        self.proposal = None
+        self.nbrs.append(new)
+        self.parent.append(i)
+        self.size.append(1)
+        for j in new:
+            self.nbrs[j].add(i)
+            if not self.dirty:
+                self.union(i, j)
+
+    def delete(self, i):
+        """
+        Remove particle i from neighbor list and clusters, moving the
+        last particle into its place like Particles.delete
+        """
+        if self.stale:
+            return
+        self.proposal = None
+        for j in self.nbrs[i]:
+            self.nbrs[j].discard(i)
+        last = len(self.nbrs) - 1
+        if i != last:
+            for j in self.nbrs[last]:
+                self.nbrs[j].discard(last)
+                self.nbrs[j].add(i)
+            self.nbrs[i] = self.nbrs[last]
+        self.nbrs.pop()
+        self.parent.pop()
+        self.size.pop()
+        # union-find cannot remove a member, clusters are recomputed
+        # from the neighbor list when queried next
+        self.dirty = True
+
+    def update(self, r, i):
+        """
+        Update neighbor list and clusters after particle i was moved
+        """
+        if self.stale:
+            self.build(r)
+            return
+        if self.proposal is not None and self.proposal[0] == i:
+            _, new, lost, connected = self.proposal
+        else:
+            new = self.neighbors(r, i)
+            lost = self.nbrs[i] - new
+            connected = not lost
+        self.proposal = None
+        for j in lost:
+            self.nbrs[j].discard(i)
+        for j in new - self.nbrs[i]:
+            self.nbrs[j].add(i)
+        self.nbrs[i] = new
+        if not connected:
+            # removing bonds may split a cluster, which union-find cannot
+            # undo, so it is recomputed when clusters are queried next
+            self.dirty = True
+        elif not self.dirty:
+            for j in new:
+                self.union(i, j)
+
+    def labels(self, r):
+        """
+        Cluster label of every particle
+        """
+        if self.stale:
+            self.build(r)
+        elif self.dirty:
+            self.unite_all()
+        return np.array([self.find(i) for i in range(len(self.parent))])
+
+    def sizes(self, r):
+        """
+        Size of every cluster, largest first
+        """
+        _, counts = np.unique(self.labels(r), return_counts=True)
+        return np.sort(counts)[::-1]
@@ -1,6 +1,6 @@
 import sys
 import numpy as np
-from tqdm import tqdm
+from time import perf_counter
 from pathlib import Path
 
 
@@ -12,32 +12,138 @@ class TmpName:
     from .forcefield import LennardJones
     from .integrator import VelocityVerlet
     from .sampler import Metropolis
+    from .cluster import Cluster
+    from .particles import Particles
+    from .energy import Energy
+    from .schedule import Scheduler
 
     def __init__(self, dir, position, velocity=Zero(), info=False):
         self.p = Path(dir)
         self.p.mkdir(parents=True, exist_ok=True)
 
-        self.r = position()
-        self.v = velocity(self.r.shape)
+        r = position()
+        self.particles = self.Particles(r, velocity(r.shape))
+        self.type_names = np.array(['Ar'])
         self.t = 0
+        self.energy = self.Energy()
 
-        self.npar, self.ndim = self.r.shape
+        self.ndim = self.particles.ndim
 
         self.dumpobj = self.Dump(np.inf, "dump.xyz", ())
         self.thermoobj = self.Thermo(np.inf, "log.tmp_name", ())
-        self.outputs = []
+        self.hooks = self.Scheduler()
+        self.analyses = []
+        self.progress = None
 
         self.info = info
 
         self.forcefield = self.LennardJones(1, 1, 3)
+        self.forcefield.set_particles(self.particles)
         self.a, self.u = self.forcefield.eval_acc_energy(self.r)
         self.integrator = self.VelocityVerlet(dt=0.01)
         self.integrator.set_forcefield(self.forcefield)
         self.sampler = self.Metropolis()
         self.sampler.set_forcefield(self.forcefield)
+        self.cluster = None
 
         self.moves = []
         self.moves_prob = []
+        self.move_stats = np.zeros((0, 2), dtype=int)   # attempted, accepted
+
+    @property
+    def npar(self):
+        return self.particles.npar
+
+    @property
+    def r(self):
+        return self.particles.r
+
+    @r.setter
+    def r(self, r):
+        self.particles.set('r', r)
+
+    @property
+    def v(self):
+        return self.particles.v
+
+    @v.setter
+    def v(self, v):
+        self.particles.set('v', v)
+
+    @property
+    def a(self):
+        return self.particles.a
+
+    @a.setter
+    def a(self, a):
+        self.particles.set('a', a)
+
+    @property
+    def types(self):
+        return self.particles.types
+
+    @types.setter
+    def types(self, types):
+        self.particles.set('types', types)
+
+    def set_types(self, types, names=None):
+        """
+        Set particle types. The force field parameters of type t are
+        found in row/column t of its per-pair-type tables.
+
+        types : array_like
+            integer type of every particle
+        names : list of str
+            name of every type, written to dump files. If not given
+            and the current names do not cover all types, types are
+            named by their number
+        """
+        self.forcefield.check_types(types)
+        ntypes = np.max(types, initial=-1) + 1
+        if names is not None:
+            if len(names) < ntypes:
+                raise ValueError(f"{len(names)} type names given for {ntypes} types")
+            self.type_names = np.asarray(names)
+        elif len(self.type_names) < ntypes:
+            self.type_names = np.array([str(t) for t in range(ntypes)])
+        self.types = types
+        if self.particles.type_masses is not None:
+            self.particles.set_masses(self.particles.type_masses, by_type=True)
+        self.a, self.u = self.forcefield.eval_acc_energy(self.r)
+
+    @property
+    def u(self):
+        return self.energy.u
+
+    @u.setter
+    def u(self, u):
+        self.energy.set(u)
+
+    @property
+    def mass(self):
+        return self.particles.mass
+
+    def set_masses(self, masses, by_type=False):
+        """
+        Set particle masses. The force field divides forces by the
+        masses, so the accelerations are recomputed.
+
+        masses : float or array_like
+            mass of all particles, of every particle or of every type
+        by_type : bool
+            masses are given per type (indexed by particle type)
+        """
+        self.particles.set_masses(masses, by_type)
+        self.a, self.u = self.forcefield.eval_acc_energy(self.r)
+
+    def set_velocity(self, velocity):
+        """
+        Reinitialize velocities, taking particle masses into account
+
+        velocity : obj
+            InitVelocity object from tmp_name.initvelocity
+        """
+        self.v = velocity(self.r.shape, self.mass)
 
     def set_forcefield(self, forcefield):
         """
@@ -46,6 +152,7 @@ class TmpName:
         forcefield : obj
             ForceField object from tmp_name.forcefield
         """
+        forcefield.set_particles(self.particles)
         self.a, self.u = forcefield.eval_acc_energy(self.r)
         self.forcefield = forcefield
         self.integrator.set_forcefield(self.forcefield)
@@ -58,14 +165,53 @@ class TmpName:
         self.integrator.set_forcefield(self.forcefield)
 
     def set_sampler(self, sampler):
+        """
+        Set sampler. If the sampler has a finite Stillinger limit,
+        clusters are tracked and moves splitting a cluster are rejected
+
+        sampler : obj
+            Sampler object from tmp_name.sampler
+        """
         self.sampler = sampler
         self.sampler.set_forcefield(self.forcefield)
+        if np.isfinite(sampler.stillinger_lim):
+            self.set_cluster(sampler.stillinger_lim)
+            self.sampler.set_cluster(self.cluster)
+
+    def set_cluster(self, rc):
+        """
+        Track clusters of particles closer than rc
+
+        rc : float
+            bond length of the Stillinger criterion
+        """
+        self.cluster = self.Cluster(rc)
+        self.cluster.build(self.r)
+
+    def get_cluster(self):
+        """
+        Get cluster object, using the force field cutoff as bond
+        length if no cluster is tracked yet
+        """
+        if self.cluster is None:
+            self.set_cluster(self.forcefield.cutoff)
+        return self.cluster
 
-    def set_output(self, style, filename):
+    def add_hook(self, func, freq):
         """
-        Printing output to file
+        Call func(solver) every freq steps of run_md and run_mc, after
+        dump, analyses and thermo. Hooks may modify the state, for
+        instance to act as a thermostat.
+
+        Returns
+        -------
+        obj
+            Hook object, which can be passed to remove_hook
         """
-        self.outputs.append(style)
+        return self.hooks.add(func, freq)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
 
     def add_move(self, move, probability):
         """
@@ -73,13 +219,45 @@ class TmpName:
         """
         self.moves.append(move)
         self.moves_prob.append(probability)
+        self.move_stats = np.vstack((self.move_stats, np.zeros((1, 2), dtype=int)))
+
+    def check_energy(self, freq, file):
+        """
+        Recompute the potential energy from scratch every freq steps
+        of run_mc, writing the accumulated energy drift to file
+        """
+        if self.info:
+            print(f"\nRecomputing energy every {freq}th step, writing discrepancy to file '{file}'")
+        self.energy.set_check(freq, file)
+
+    def add_analysis(self, analysis):
+        """
+        Add streaming analysis, sampled during run_md
 
-    def dump(self, freq, file, *quantities):
+        analysis : obj
+            Analysis object from tmp_name.analysis
+        """
+        if self.info:
+            print(f"\nSampling {analysis.__class__.__name__} every {analysis.freq}th step to file '{analysis.file}'")
+        self.analyses.append(analysis)
+
+    def dump(self, freq, file, *quantities, compress=False, **kwargs):
         """Dump per-atom quantities to file
+
+        compress : bool
+            write a compressed binary trajectory instead of text, see
+            tmp_name.dump.CompressedDump for keyword arguments
+            (precision, chunk, codec, level)
         """
         if self.info:
             print(f"\nDumping every {freq}th (", ", ".join(quantities), f") to file '{file}'")
-        self.dumpobj = self.Dump(freq, file, quantities)
+        if hasattr(self.dumpobj, 'close'):
+            self.dumpobj.close()
+        if compress:
+            from .dump import CompressedDump
+            self.dumpobj = CompressedDump(freq, file, quantities, **kwargs)
+        else:
+            self.dumpobj = self.Dump(freq, file, quantities)
 
     def thermo(self, freq, file, *quantities):
         """Print thermo-quantities to file
@@ -105,46 +283,182 @@ class TmpName:
         tmp_dumpobj(self)
         del tmp_dumpobj
 
-    def iterations(self, steps, out):
+    def start(self, steps, out):
+        """
+        Prepare run, returning a progress bar if out is "tqdm", or a
+        throttled progress report writing a structured log (run.jsonl
+        in the simulation directory) if out is "headless"
+        """
         self.t0 = self.t
-        iterations = range(self.t0, self.t0 + steps + 1)
         if out == "tqdm":
+            from tqdm import tqdm   # deferred, tqdm is slow to import
             sys.stdout.flush()
-            iterations = tqdm(iterations)
+            return tqdm(total=steps + 1)
+        elif out == "headless":
+            from .progress import Progress
+            return Progress(steps + 1, self.p / "run.jsonl")
         elif out == "log":
             self.thermoobj.write_header()
         #else: whatever else will give no output ("no", "off", "false" etc)
-        return iterations
-        
+        return None
 
-    def run_md(self, steps, out="tqdm"):
+    def schedule(self, out, md=True):
         """
-        Run Molecular Dynamics simulation
+        Collect the hooks of a run: energy check (Monte Carlo only),
+        dump, analyses (Molecular Dynamics only), thermo and user hooks
         """
-        for self.t in self.iterations(steps, out):
-            self.r, self.v, self.a, self.u = self.integrator(self.r, self.v, self.a)
-            self.dumpobj(self)
-            log = self.thermoobj(self)
+        def thermo(solver):
+            log = solver.thermoobj(solver)
             if out == "log":
                 print(log, end="")
+            elif out == "headless" and log:
+                self.progress.record(**{"event": "thermo", **solver.thermoobj.last,
+                                        "step": solver.t})
+
+        hooks = self.Scheduler()
+        if not md and self.energy.f is not None:
+            hooks.add(self.energy, self.energy.freq)
+        hooks.add(self.dumpobj, self.dumpobj.freq)
+        if md:
+            for analysis in self.analyses:
+                hooks.add(analysis, analysis.freq)
+        hooks.add(thermo, self.thermoobj.freq)
+        hooks.hooks += self.hooks.hooks
+        return hooks
 
-    def run_mc(self, steps, out="tqdm"):
+    def stretches(self, steps, out, hooks, bounded=True):
+        """
+        Split the run into stretches ending at steps where any hook
+        fires (or at the last step). Yields first and last step of
+        every stretch, the hooks are fired after each stretch. With a
+        progress report and bounded set, stretches are also cut to take
+        between half and one refresh interval of the report (0.1 seconds
+        for tqdm), so that progress is shown during long stretches
+        without hooks.
+        """
+        progress = self.progress = self.start(steps, out)
+        bounded = bounded and progress is not None
+        refresh = getattr(progress, 'interval', 0.1)
+        t, t_end = self.t0, self.t0 + steps
+        block = 1       # longest stretch, adapted to the wall time
+        clock = perf_counter()
+        while t <= t_end:
+            t_next = int(min(hooks.next_event(t), t_end))
+            if bounded:
+                t_next = min(t_next, t + block - 1)
+            yield t, t_next
+            self.t = t_next
+            hooks.fire(self)
+            if progress is not None:
+                progress.update(t_next - t + 1)
+            if bounded:
+                now = perf_counter()
+                if t_next - t + 1 == block and now - clock < refresh / 2:
+                    block *= 2
+                elif now - clock > refresh and block > 1:
+                    block //= 2
+                clock = now
+            t = t_next + 1
+        if progress is not None:
+            progress.close()
+        self.progress = None
+
+    def minimize(self, minimizer=None):
+        """
+        Minimize the potential energy, typically before dynamics
+
+        minimizer : obj
+            Minimizer object from tmp_name.minimizer, FIRE by default
+        """
+        if minimizer is None:
+            from .minimizer import FIRE
+            minimizer = FIRE()
+        minimizer.set_forcefield(self.forcefield)
+        u0 = self.u
+        self.r, self.a, self.u = minimizer(self.r, self.mass)
+        if self.cluster is not None:
+            self.cluster.invalidate()
+        if self.info:
+            print(f"\nMinimized energy from {u0} to {self.u} in {minimizer.niter} iterations "
+                  f"({minimizer.ncalls} force calls), stopping criterion: {minimizer.criterion}")
+        return minimizer
+
+    def run_md(self, steps, out="tqdm", nprocs=1):
+        """
+        Run Molecular Dynamics simulation
+
+        out : str
+            "tqdm" (progress bar), "log" (print thermo output),
+            "headless" (batch jobs, see tmp_name.progress) or anything
+            else for no output
+        nprocs : int
+            number of worker processes. If larger than one, the system
+            is split into slabs integrated in parallel, see
+            tmp_name.domain
+        """
+        if nprocs > 1:
+            from .domain import DomainDecomposition
+            DomainDecomposition(nprocs).run(self, steps, out)
+            if self.cluster is not None:
+                self.cluster.invalidate()
+            return
+        hooks = self.schedule(out)
+        for t, t_next in self.stretches(steps, out, hooks):
+            r, v, a = self.r, self.v, self.a
+            for _ in range(t_next - t + 1):
+                r, v, a, u = self.integrator(r, v, a)
+            self.r, self.v, self.a, self.u = r, v, a, u
+            if self.cluster is not None:
+                self.cluster.invalidate()
+
+    def run_mc(self, steps, out="tqdm", tune=False, target=0.5, block=100):
         """
         Run Monte Carlo simulation
+
+        tune : bool
+            equilibration mode. The step size of every move type is
+            adapted toward the target acceptance rate after every block
+            of attempts of that move. Run without tune for production,
+            keeping the step sizes found. The acceptance statistics
+            (move_stats) are reset at the start of every run, so they
+            do not mix step sizes of tuning and production.
+        target : float
+            target acceptance rate
+        block : int
+            number of attempts of a move type between adaptations
         """
         naccept = 0
-        for self.t in self.iterations(steps, out):
-            # choose move type
-            move = np.random.choice(self.moves, p=self.moves_prob)
-            r_new = self.sampler.propose_move(self.r, move)
-            accept = self.sampler.accept_move(move)
-            if accept:
-                self.r = r_new
-                self.u += self.sampler.du
-                naccept += 1
+        self.move_stats[:] = 0
+        block_stats = np.zeros_like(self.move_stats)
+        hooks = self.schedule(out, md=False)
+        for t, t_next in self.stretches(steps, out, hooks):
+            for self.t in range(t, t_next + 1):
+                # choose move type
+                k = np.random.choice(len(self.moves), p=self.moves_prob)
+                move = self.moves[k]
+                if move.swap:
+                    self.sampler.propose_swap(self.particles, move)
+                else:
+                    self.sampler.propose_move(self.r, move)
+                accept = self.sampler.accept_move(move)
+                if accept:
+                    self.sampler.apply_move(self.particles)
+                    self.energy.add(self.sampler.du)
+                    naccept += 1
+                    if self.cluster is None:
+                        pass
+                    elif self.sampler.dn == 0:
+                        self.cluster.update(self.r, self.sampler.i)
+                    elif self.sampler.dn == 1:
+                        self.cluster.insert(self.r, self.sampler.i)
+                    else:
+                        self.cluster.delete(self.sampler.i)
+                else:
+                    self.sampler.reject_move(self.particles)
+                self.move_stats[k] += 1, accept
+                if tune:
+                    block_stats[k] += 1, accept
+                    if block_stats[k, 0] == block:
+                        move.tune(block_stats[k, 1] / block, target)
+                        block_stats[k] = 0
             self.acc_ratio = naccept/(self.t-self.t0+1)
-
-            self.dumpobj(self)
-            log = self.thermoobj(self)
-            if out == "log":
-                print(log, end="")
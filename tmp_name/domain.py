@@ -0,0 +1,224 @@
+import copy
+import numpy as np
+from types import SimpleNamespace
+from multiprocessing import Pipe, Process
+
+
+class DomainDecomposition:
+    """
+    Molecular dynamics with the system split into slabs along the first
+    axis, each slab integrated by its own worker process. Every step,
+    atoms that left a slab migrate to the neighboring worker, and atoms
+    within the cutoff of a slab boundary are sent to the neighbor as
+    ghost atoms. The outermost slabs extend to infinity, as the system
+    has open boundaries. The state is gathered in the calling process
+    only at steps where a hook fires. Hooks modifying the state
+    (thermostats) are not supported, as changes are not sent back.
+
+    nprocs : int
+        number of worker processes
+    """
+    def __init__(self, nprocs):
+        self.nprocs = nprocs
+
+    def bounds(self, r, cutoff):
+        """
+        Split the extent of the system into equally wide slabs
+        """
+        edges = np.linspace(r[:, 0].min(), r[:, 0].max(), self.nprocs + 1)
+        if edges[1] - edges[0] < cutoff:
+            raise ValueError("Slabs are narrower than the cutoff, "
+                             "use fewer processes")
+        edges[0], edges[-1] = -np.inf, np.inf
+        return edges
+
+    def run(self, solver, steps, out):
+        """
+        Run steps of Velocity Verlet integration, writing output
+        in the calling process
+        """
+        from .integrator import VelocityVerlet
+        if not isinstance(solver.integrator, VelocityVerlet):
+            raise NotImplementedError("Domain decomposition requires VelocityVerlet")
+
+        ff = copy.copy(solver.forcefield)
+        ff.particles = None
+        edges = self.bounds(solver.r, ff.cutoff)
+        slab = np.searchsorted(edges, solver.r[:, 0], side='right') - 1
+        ids = np.arange(solver.npar)
+        hooks = solver.schedule(out)
+        freqs = hooks.freqs()
+        t0 = solver.t
+
+        # pipes between neighboring workers, and to this process
+        links = [Pipe() for _ in range(self.nprocs - 1)]
+        ctrl = [Pipe() for _ in range(self.nprocs)]
+        workers = []
+        for k in range(self.nprocs):
+            own = slab == k
+            state = Worker.pack(ids[own], solver.types[own], solver.mass[own],
+                                solver.r[own], solver.v[own], solver.a[own])
+            worker = Worker(k, edges[k], edges[k + 1], state, ff, solver.integrator.dt,
+                            links[k - 1][1] if k > 0 else None,
+                            links[k][0] if k < self.nprocs - 1 else None,
+                            ctrl[k][1])
+            workers.append(Process(target=worker.run, args=(t0, steps, freqs)))
+        for process in workers:
+            process.start()
+
+        # the force field in this process did not compute these pairs
+        solver.forcefield.distanceSqrd = None
+        try:
+            # workers only send their state at hook steps, so stretches
+            # cannot be cut for the progress bar
+            for t, t_next in solver.stretches(steps, out, hooks, bounded=False):
+                # the stretch ends where a hook fires, gather state there
+                u = 0
+                for conn, _ in ctrl:
+                    state, u_local = self.receive(conn, workers)
+                    ids, _, _, r, v, a = Worker.unpack(state, solver.ndim)
+                    solver.r[ids] = r
+                    solver.v[ids] = v
+                    solver.a[ids] = a
+                    u += u_local
+                solver.u = u
+        except BaseException:
+            # workers would block on a full pipe or wait for a dead
+            # neighbor forever
+            for process in workers:
+                process.terminate()
+            raise
+        finally:
+            for process in workers:
+                process.join()
+
+    @staticmethod
+    def receive(conn, workers, timeout=1.):
+        """
+        Receive from a worker, checking every timeout seconds that no
+        worker has failed, as the worker may wait for a neighbor.
+        Workers that are done exit with code 0.
+        """
+        while not conn.poll(timeout):
+            for process in workers:
+                if process.exitcode:
+                    raise RuntimeError(f"Worker process {process.name} exited "
+                                       f"with code {process.exitcode}")
+        return conn.recv()
+
+
+class Worker:
+    """
+    Integrates the atoms of a single slab lo <= x < hi
+    """
+    def __init__(self, rank, lo, hi, state, forcefield, dt, left, right, ctrl):
+        self.rank = rank
+        self.lo = lo
+        self.hi = hi
+        self.ndim = (state.shape[1] - 3) // 3
+        self.ids, self.types, self.mass, self.r, self.v, self.a = self.unpack(state, self.ndim)
+        self.forcefield = forcefield
+        self.dt = dt
+        self.left = left
+        self.right = right
+        self.ctrl = ctrl
+
+    @staticmethod
+    def pack(ids, types, mass, r, v, a):
+        """
+        Pack per-atom data into a single array, one row per atom
+        """
+        return np.column_stack((ids, types, mass, r, v, a))
+
+    @staticmethod
+    def unpack(state, ndim):
+        ids = state[:, 0].astype(int)
+        types = state[:, 1].astype(int)
+        mass = state[:, 2].copy()
+        r = state[:, 3:3+ndim].copy()
+        v = state[:, 3+ndim:3+2*ndim].copy()
+        a = state[:, 3+2*ndim:3+3*ndim].copy()
+        return ids, types, mass, r, v, a
+
+    @staticmethod
+    def gather(t, freqs):
+        return any(t % freq == 0 for freq in freqs)
+
+    def state(self, mask=slice(None)):
+        return self.pack(self.ids[mask], self.types[mask], self.mass[mask],
+                         self.r[mask], self.v[mask], self.a[mask])
+
+    def shift(self, to_left, to_right):
+        """
+        Send data to both neighbors and receive from both. Even ranks
+        send before receiving and odd ranks the other way around, so
+        that large messages cannot deadlock.
+        """
+        received = []
+        for send, conn_send, conn_recv in ((to_right, self.right, self.left),
+                                           (to_left, self.left, self.right)):
+            if self.rank % 2 == 0:
+                if conn_send is not None:
+                    conn_send.send(send)
+                if conn_recv is not None:
+                    received.append(conn_recv.recv())
+            else:
+                if conn_recv is not None:
+                    received.append(conn_recv.recv())
+                if conn_send is not None:
+                    conn_send.send(send)
+        return received
+
+    def migrate(self):
+        """
+        Hand over atoms that left the slab to the neighbors
+        """
+        x = self.r[:, 0]
+        to_left, to_right = x < self.lo, x >= self.hi
+        received = self.shift(self.state(to_left), self.state(to_right))
+        keep = ~(to_left | to_right)
+        state = np.vstack([self.state(keep)] + received)
+        self.ids, self.types, self.mass, self.r, self.v, self.a = self.unpack(state, self.ndim)
+
+    def halo(self, cutoff):
+        """
+        Exchange positions and types of atoms within the cutoff
+        of the slab boundaries
+        """
+        x = self.r[:, 0]
+        to_left = np.column_stack((self.types, self.r))[x < self.lo + cutoff]
+        to_right = np.column_stack((self.types, self.r))[x >= self.hi - cutoff]
+        ghosts = np.vstack([np.empty((0, self.ndim + 1))] + self.shift(to_left, to_right))
+        return ghosts[:, 0].astype(int), ghosts[:, 1:]
+
+    def eval_acc_energy(self):
+        """
+        Evaluate acceleration of owned atoms and their share of the
+        energy. Pairs with a ghost atom are computed by both slabs,
+        so they contribute half their energy in each.
+        """
+        ff = self.forcefield
+        ghost_types, ghost_r = self.halo(ff.cutoff)
+        nown = len(self.r)
+        r = np.vstack((self.r, ghost_r))
+        ff.particles = SimpleNamespace(types=np.concatenate((self.types, ghost_types)))
+        i, j, dr, distanceSqrd, ti, tj = ff.distance_matrix_triu(r)
+        factor, energy = ff.pair_factor_energy(distanceSqrd, ti, tj)
+        # owned atoms come first and i < j, so i is owned if any is
+        keep = i < nown
+        i, j, dr, factor, energy = i[keep], j[keep], dr[keep], factor[keep], energy[keep]
+        force = np.einsum('i,ij->ij', factor, dr)
+        acc = ff.accumulate(i, j, force, len(r))[:nown] / self.mass[:, np.newaxis]
+        u = np.sum(np.where(j < nown, energy, 0.5 * energy))
+        return acc, u
+
+    def run(self, t0, steps, freqs):
+        dt = self.dt
+        for t in range(t0, t0 + steps + 1):
+            self.r += self.v * dt + 0.5 * self.a * dt**2
+            self.migrate()
+            a, u = self.eval_acc_energy()
+            self.v += 0.5 * (a + self.a) * dt
+            self.a = a
+            if self.gather(t, freqs) or t == t0 + steps:
+                self.ctrl.send((self.state(), u))
@@ -1,4 +1,7 @@
-from numpy import savetxt, column_stack
+import json
+import atexit
+import struct
+from numpy import savetxt, column_stack, rint, frombuffer, searchsorted
 
 
 class Dump:
@@ -8,8 +11,7 @@ class Dump:
         self.f = open(file, 'w')
 
     def collect_data(self, solver, quantities):
-        # temporary way to set particle types
-        dat = [solver.npar * ['Ar']]
+        dat = [solver.type_names[solver.types]]
         for quantity in quantities:
             dat.append(getattr(self, quantity)(solver))
         return column_stack(dat)
@@ -21,10 +23,10 @@ class Dump:
         return header
 
     def __call__(self, solver):
-        #if solver.t % self.freq == 0:
-        dat = self.collect_data(solver, self.quantities)
-        header = self.make_header(solver.npar, self.quantities)
-        savetxt(self.f, dat, header=header, fmt="%s", comments='')
+        if solver.t % self.freq == 0:
+            dat = self.collect_data(solver, self.quantities)
+            header = self.make_header(solver.npar, self.quantities)
+            savetxt(self.f, dat, header=header, fmt="%s", comments='')
 
     @staticmethod
     def x(solver):
@@ -64,3 +66,237 @@ class Dump:
 
     def __del__(self):
         self.f.close()
+
+
+class CompressedDump(Dump):
+    """
+    Compressed binary trajectory. Frames are collected in chunks of
+    chunk frames, and every chunk is compressed and written by a
+    background thread while the simulation continues. With a finite
+    precision, coordinates are quantized to integers (lossy, like XTC)
+    and stored as differences from the previous frame, which compresses
+    well. An index of all chunks is written when the file is closed,
+    for random access with Trajectory.
+
+    precision : float
+        quantization precision, None for lossless float64
+    chunk : int
+        number of frames per chunk
+    codec : str
+        'zlib' or 'zstd' (requires the zstandard package)
+    level : int
+        compression level
+    """
+    MAGIC = b"TMPTRJ1\n"
+
+    def __init__(self, freq, file, quantities, precision=1e-3, chunk=100,
+                 codec='zlib', level=6):
+        from concurrent.futures import ThreadPoolExecutor
+        self.freq = freq
+        self.quantities = quantities
+        self.precision = precision
+        self.chunk = chunk
+        self.compress = get_codec(codec, level)[0]
+        self.codec = codec
+        self.f = open(file, 'wb')
+        self.frames = []
+        self.previous = None
+        self.index = []            # (offset, first step, number of frames)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = []
+        self.closed = False
+        self.header = None
+        atexit.register(self.close)
+
+    def write_header(self, solver):
+        header = {'quantities': list(self.quantities), 'precision': self.precision,
+                  'codec': self.codec, 'type_names': [str(name) for name in solver.type_names]}
+        header = json.dumps(header).encode()
+        self.f.write(self.MAGIC + struct.pack('<Q', len(header)) + header)
+        self.header = header
+
+    def encode_frame(self, solver):
+        """
+        Encode frame as bytes: step, number of particles, encoding
+        flag, types and data
+        """
+        dat = column_stack([getattr(self, quantity)(solver) for quantity in self.quantities])
+        dat = dat.astype(float).reshape(solver.npar, len(self.quantities))
+        types = solver.types.astype('<i4')
+        flag = 2
+        if self.precision is not None:
+            q = rint(dat / self.precision)
+            if abs(q).max(initial=0) < 2**31:
+                q = q.astype('<i4')
+                if self.previous is not None and self.previous.shape == q.shape:
+                    flag, dat = 1, q - self.previous
+                else:
+                    flag, dat = 0, q
+                self.previous = q
+            else:
+                self.previous = None
+        if flag == 2:
+            dat = dat.astype('<f8')
+        return struct.pack('<qqB', solver.t, solver.npar, flag) + types.tobytes() + dat.tobytes()
+
+    def __call__(self, solver):
+        if solver.t % self.freq == 0:
+            if self.header is None:
+                self.write_header(solver)
+            if not self.frames:
+                self.previous = None       # chunks are decoded independently
+                self.first_step = solver.t
+            self.frames.append(self.encode_frame(solver))
+            if len(self.frames) == self.chunk:
+                self.flush()
+
+    def flush(self):
+        """
+        Hand the collected frames over to the compression thread
+        """
+        if self.frames:
+            frames, self.frames = self.frames, []
+            self.pending.append(self.executor.submit(self.write_chunk, b"".join(frames),
+                                                     self.first_step, len(frames)))
+
+    def write_chunk(self, data, first_step, nframes):
+        payload = self.compress(data)
+        self.index.append((self.f.tell(), first_step, nframes))
+        self.f.write(struct.pack('<Q', len(payload)) + payload)
+
+    def close(self):
+        """
+        Write remaining frames and the chunk index, and close file
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.flush()
+        self.executor.shutdown(wait=True)
+        for future in self.pending:
+            future.result()     # raise errors from the compression thread
+        if self.header is None:
+            self.f.close()
+            return
+        index = json.dumps(self.index).encode()
+        offset = self.f.tell()
+        self.f.write(struct.pack('<Q', 0) + index + struct.pack('<QQ', offset, len(index)) + self.MAGIC)
+        self.f.close()
+        atexit.unregister(self.close)
+
+    def __del__(self):
+        self.close()
+
+
+def get_codec(codec, level=6):
+    """
+    Get compress and decompress functions of codec
+    """
+    if codec == 'zlib':
+        import zlib
+        return (lambda data: zlib.compress(data, level)), zlib.decompress
+    if codec == 'zstd':
+        import zstandard    # optional dependency
+        return (zstandard.ZstdCompressor(level=level).compress,
+                zstandard.ZstdDecompressor().decompress)
+    raise ValueError(f"Unknown codec '{codec}'")
+
+
+class Trajectory:
+    """
+    Reader of trajectories written by CompressedDump. Frames are read
+    by index, decompressing only the chunk holding the frame. Files
+    that were not closed properly (no index) are scanned chunk by chunk.
+
+    Returns frames as (step, types, data), where data has one column
+    per quantity.
+    """
+    def __init__(self, file):
+        self.f = open(file, 'rb')
+        magic = self.f.read(len(CompressedDump.MAGIC))
+        if magic != CompressedDump.MAGIC:
+            raise ValueError(f"'{file}' is not a compressed trajectory")
+        size, = struct.unpack('<Q', self.f.read(8))
+        self.header = json.loads(self.f.read(size))
+        self.quantities = self.header['quantities']
+        self.type_names = self.header['type_names']
+        self.decompress = get_codec(self.header['codec'])[1]
+        self.chunks = self.read_index()
+        self.nframes = [n for _, _, n in self.chunks]
+        self.first_frame = [sum(self.nframes[:i]) for i in range(len(self.nframes))]
+        self.cache = (None, None)
+
+    def read_index(self):
+        start = self.f.tell()
+        self.f.seek(0, 2)
+        end = self.f.tell()
+        trailer = 16 + len(CompressedDump.MAGIC)
+        if end - start >= trailer:
+            self.f.seek(end - trailer)
+            offset, size = struct.unpack('<QQ', self.f.read(16))
+            if self.f.read() == CompressedDump.MAGIC:
+                self.f.seek(offset + 8)
+                return [tuple(chunk) for chunk in json.loads(self.f.read(size))]
+        # no index, scan chunks
+        chunks = []
+        self.f.seek(start)
+        while True:
+            offset = self.f.tell()
+            raw = self.f.read(8)
+            if len(raw) < 8:
+                break
+            size, = struct.unpack('<Q', raw)
+            if size == 0:
+                break
+            frames = self.decode_chunk(self.decompress(self.f.read(size)))
+            chunks.append((offset, frames[0][0], len(frames)))
+        return chunks
+
+    def decode_chunk(self, data):
+        frames = []
+        previous = None
+        pos = 0
+        nq = len(self.quantities)
+        while pos < len(data):
+            step, npar, flag = struct.unpack_from('<qqB', data, pos)
+            pos += 17
+            types = frombuffer(data, '<i4', npar, pos)
+            pos += 4 * npar
+            if flag == 2:
+                dat = frombuffer(data, '<f8', npar * nq, pos).reshape(npar, nq)
+                pos += 8 * npar * nq
+                previous = None
+            else:
+                q = frombuffer(data, '<i4', npar * nq, pos).reshape(npar, nq)
+                pos += 4 * npar * nq
+                if flag == 1:
+                    q = q + previous
+                previous = q
+                dat = q * self.header['precision']
+            frames.append((step, types, dat))
+        return frames
+
+    def chunk(self, c):
+        if self.cache[0] != c:
+            self.f.seek(self.chunks[c][0])
+            size, = struct.unpack('<Q', self.f.read(8))
+            self.cache = (c, self.decode_chunk(self.decompress(self.f.read(size))))
+        return self.cache[1]
+
+    def __len__(self):
+        return sum(self.nframes)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("frame index out of range")
+        c = searchsorted(self.first_frame, i, side='right') - 1
+        return self.chunk(c)[i - self.first_frame[c]]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __del__(self):
+        self.f.close()
@@ -0,0 +1,61 @@
+import numpy as np
+
+
+class Energy:
+    """
+    Potential energy accounting for Monte Carlo. Per-move energy
+    changes are accumulated using compensated (Kahan) summation, and
+    the energy is recomputed from scratch every freq steps, writing the
+    accumulated energy, the recomputed energy and the discrepancy
+    to file.
+
+    u : float
+        initial potential energy
+    """
+    def __init__(self, u=0.):
+        self.set(u)
+        self.freq = np.inf
+        self.f = None
+
+    def set(self, u):
+        """
+        Reset energy, dropping the compensation term
+        """
+        self.u = u
+        self.c = 0.
+
+    def add(self, du):
+        """
+        Add energy change using Kahan summation
+        """
+        y = du - self.c
+        t = self.u + y
+        self.c = (t - self.u) - y
+        self.u = t
+
+    def set_check(self, freq, file):
+        """
+        Recompute energy every freq steps, and write discrepancy to file
+        """
+        if self.f is not None:
+            self.f.close()
+        self.freq = freq
+        self.f = open(file, 'w')
+        self.f.write("{:<12}{:<24}{:<24}{:<24}\n".format("step", "accumulated", "recomputed", "discrepancy"))
+
+    def __call__(self, solver):
+        if self.f is not None and solver.t % self.freq == 0:
+            self.recompute(solver)
+
+    def recompute(self, solver):
+        """
+        Recompute energy (and acceleration) of entire system
+        """
+        solver.a, u = solver.forcefield.eval_acc_energy(solver.r)
+        self.f.write("{:<12}{:<24.15e}{:<24.15e}{:<24.15e}\n".format(solver.t, self.u, u, u - self.u))
+        self.f.flush()
+        self.set(u)
+
+    def __del__(self):
+        if self.f is not None:
+            self.f.close()
@@ -3,101 +3,164 @@ import numpy as np
 
 class LennardJones:
     """
-    Lennard-Jones force field
+    Lennard-Jones force field, shifted to zero at the cutoff. Supports
+    several particle types: sigma, epsilon and cutoff can be given as
+    scalars, per-type vectors which are combined using the mixing rule,
+    or per-pair-type matrices.
+
+    sigma : float or array_like
+        length scale
+    epsilon : float or array_like
+        energy scale
+    cutoff : float or array_like
+        cutoff distance
+    mixing : str
+        'lorentz-berthelot' (arithmetic sigma, geometric epsilon) or
+        'geometric' (geometric sigma and epsilon)
     """
-    def __init__(self, sigma=1, epsilon=1, cutoff=3):
+    def __init__(self, sigma=1, epsilon=1, cutoff=3, mixing='lorentz-berthelot'):
         # super
-        self.sigma = sigma
-        self.epsilon = epsilon
-        self.cutoff = cutoff
-        self.cutoff2 = cutoff * cutoff
-        self.cutoff_corr = cutoff**(-12) + cutoff**(-6)
+        if mixing == 'lorentz-berthelot':
+            sigma_mix = self.arithmetic
+        elif mixing == 'geometric':
+            sigma_mix = self.geometric
+        else:
+            raise ValueError(f"Unknown mixing rule '{mixing}'")
+        self.sigma = self.pair_table(sigma, sigma_mix)
+        self.epsilon = self.pair_table(epsilon, self.geometric)
+        self.cutoff2 = self.pair_table(cutoff, self.arithmetic)**2
+        ntypes = max(len(self.sigma), len(self.epsilon), len(self.cutoff2))
+        self.ntypes = ntypes    # 1 if the parameters apply to all types
+        shape = (ntypes, ntypes)
+        self.sigma = np.broadcast_to(self.sigma, shape)
+        self.epsilon = np.broadcast_to(self.epsilon, shape)
+        self.cutoff2 = np.broadcast_to(self.cutoff2, shape)
+        self.sigma2 = self.sigma**2
+        self.cutoff = np.sqrt(self.cutoff2.max())
+
+        sr6 = (self.sigma2 / self.cutoff2)**3
+        self.cutoff_corr = 4 * self.epsilon * (sr6**2 - sr6)
+        self.particles = None
+
+    @staticmethod
+    def arithmetic(a):
+        return (a[:, np.newaxis] + a[np.newaxis, :]) / 2
+
+    @staticmethod
+    def geometric(a):
+        return np.sqrt(a[:, np.newaxis] * a[np.newaxis, :])
+
+    @staticmethod
+    def pair_table(param, mix):
+        """
+        Get per-pair-type matrix of parameter
+        """
+        param = np.asarray(param, dtype=float)
+        if param.ndim == 0:
+            return param.reshape(1, 1)
+        if param.ndim == 1:
+            return mix(param)
+        return param
+
+    def set_particles(self, particles):
+        """
+        Set particle store, used to look up particle types and
+        inverse masses
+        """
+        self.check_types(particles.types)
+        self.particles = particles
+
+    def check_types(self, types):
+        """
+        Check that there are parameters for all particle types
+        """
+        ntypes = np.max(types, initial=-1) + 1
+        if self.ntypes > 1 and ntypes > self.ntypes:
+            raise ValueError(f"Force field has parameters for {self.ntypes} types, "
+                             f"but particles have {ntypes} types")
+
+    def get_types(self, r):
+        """
+        Type of every particle, all type 0 if the parameters do not
+        depend on type
+        """
+        if self.particles is None or self.ntypes == 1:
+            return np.zeros(len(r), dtype=int)
+        return self.particles.types
 
-    def distance_matrix(self, r):
+    def distance_matrix_triu(self, r):
         """
-        Compute distance between all particles squared
+        Find distance vectors and squared distances between all pairs
+        within the cutoff, and the indices and types of the pairs
         """
-        x, y = r[:, np.newaxis, :], r[np.newaxis, :, :]
-        dr = x - y                             # distance vector matrix
-        distanceSqrd = np.einsum('ijk,ijk->ij', dr, dr)    # r^2
-        return dr, distanceSqrd
+        npar = len(r)
+        upperTri = np.triu_indices(npar, 1)
+        dr = r[upperTri[0]] - r[upperTri[1]]
+        distanceSqrd = np.einsum('ij,ij->i', dr, dr)       # r^2
 
-    def distance_matrix_triu(self, r):
+        # Pick the pairs that are closer than the cutoff distance only
+        types = self.get_types(r)
+        ti, tj = types[upperTri[0]], types[upperTri[1]]
+        indices = np.nonzero(distanceSqrd<self.cutoff2[ti, tj])
+        i, j = upperTri[0][indices], upperTri[1][indices]
+        return i, j, dr[indices], distanceSqrd[indices], ti[indices], tj[indices]
+
+    def pair_energy(self, distanceSqrd, ti, tj):
         """
-        Pick upper triangle of distance matrix
+        Energy of pairs given their squared distances and types
         """
-        npar = len(r)
-        drAll, distanceSqrdAll = self.distance_matrix(r)
+        distancePowSixInv = (self.sigma2[ti, tj] / distanceSqrd)**3     # (s/r)^6
+        distancePowTwelveInv = distancePowSixInv**2                      # (s/r)^12
+        return 4 * self.epsilon[ti, tj] * (distancePowTwelveInv - distancePowSixInv) - self.cutoff_corr[ti, tj]
 
-        # Pick the upper triangular elements only from the matrices and flatten
-        upperTri = np.triu_indices(npar, 1)
-        distanceSqrdHalf = distanceSqrdAll[upperTri]
-        drHalf = drAll[upperTri]
+    def pair_factor_energy(self, distanceSqrd, ti, tj):
+        """
+        Force factor, such that force = factor * dr, and energy of pairs
+        """
+        epsilon = self.epsilon[ti, tj]
+        distancePowSixInv = (self.sigma2[ti, tj] / distanceSqrd)**3     # (s/r)^6
+        distancePowTwelveInv = distancePowSixInv**2                      # (s/r)^12
+        factor = 24 * epsilon * (2 * distancePowTwelveInv - distancePowSixInv) / distanceSqrd
+        energy = 4 * epsilon * (distancePowTwelveInv - distancePowSixInv) - self.cutoff_corr[ti, tj]
+        return factor, energy
 
-        # Pick the components that are closer than the cutoff distance only
-        indices = np.nonzero(distanceSqrdHalf<self.cutoff2)
-        distanceSqrd = distanceSqrdHalf[indices]
-        dr = drHalf[indices]
-        return distanceSqrdAll, distanceSqrd, dr, indices
+    @staticmethod
+    def accumulate(i, j, force, npar):
+        """
+        Sum pair forces on every particle, Newton's third law
+        """
+        acc = np.empty((npar, force.shape[1]))
+        for d in range(force.shape[1]):
+            acc[:, d] = (np.bincount(i, force[:, d], minlength=npar)
+                         - np.bincount(j, force[:, d], minlength=npar))
+        return acc
 
     def eval_energy(self, r):
         """
         Evaluate energy of entire system
         """
-        distanceSqrdAll, distanceSqrd, dr, indices = self.distance_matrix_triu(r)
-        distancePowSixInv = np.nan_to_num(distanceSqrd**(-3))      # 1/r^6
-        distancePowTwelveInv = distancePowSixInv**2                # 1/r^12
-        return np.sum(4 * (distancePowTwelveInv - distancePowSixInv - self.cutoff_corr))
+        _, _, _, distanceSqrd, ti, tj = self.distance_matrix_triu(r)
+        return np.sum(self.pair_energy(distanceSqrd, ti, tj))
 
     def eval_acc(self, r):
         """
         Evaluate acceleration of all particles
         """
-        npar = len(r)
-        ndim = len(r[0])
-        distanceSqrdAll, distanceSqrd, dr, indices = self.distance_matrix_triu(r)
-        distancePowSixInv = np.nan_to_num(distanceSqrd**(-3))      # 1/r^6
-        distancePowTwelveInv = distancePowSixInv**2                # 1/r^12
-        factor = np.divide(2 * distancePowTwelveInv - distancePowSixInv, distanceSqrd)            # (2/r^12 - 1/r^6)/r^2
-        factor[factor == np.inf] = 0
-        force = 24 * np.einsum('i,ij->ij', factor, dr)
-
-        # force
-        forceMatrix = np.zeros((npar, npar, ndim))
-        upperTri = np.triu_indices(npar, 1)
-        self.index = np.array(upperTri).T
-        index = self.index[indices].T
-        forceMatrix[(index[0], index[1])] = force
-        forceMatrix[(index[1], index[0])] = -force
-
-        return np.sum(forceMatrix, axis=1)
+        acc, _ = self.eval_acc_energy(r)
+        return acc
 
     def eval_acc_energy(self, r):
         """
         Evaluate acceleration and energy
         """
-        npar = len(r)
-        ndim = len(r[0])
-        distanceSqrdAll, distanceSqrd, dr, indices = self.distance_matrix_triu(r)
-        distancePowSixInv = np.nan_to_num(distanceSqrd**(-3))      # 1/r^6
-        distancePowTwelveInv = distancePowSixInv**2                # 1/r^12
-        
-        factor = np.divide(2 * distancePowTwelveInv - distancePowSixInv, distanceSqrd)            # (2/r^12 - 1/r^6)/r^2
-        factor[factor == np.inf] = 0
-        force = 24 * np.einsum('i,ij->ij', factor, dr)
-
-        # 
-        forceTensor = np.zeros((npar, npar, ndim))
-        upperTri = np.triu_indices(npar, 1)
-        self.index = np.array(upperTri).T
-        index = self.index[indices].T
-        forceTensor[(index[0], index[1])] = force
-        forceTensor[(index[1], index[0])] = -force
-
-        acc = np.sum(forceTensor, axis=1)
-        energy = np.sum(4 * (distancePowTwelveInv - distancePowSixInv - self.cutoff_corr))
-
-        return acc, energy
+        i, j, dr, distanceSqrd, ti, tj = self.distance_matrix_triu(r)
+        factor, energy = self.pair_factor_energy(distanceSqrd, ti, tj)
+        force = np.einsum('i,ij->ij', factor, dr)
+        acc = self.accumulate(i, j, force, len(r))
+        if self.particles is not None:
+            acc *= self.particles.invmass
+        self.distanceSqrd = distanceSqrd    # pairs within cutoff, reused by RDF
+        return acc, np.sum(energy)
 
     def distance_vector_par(self, r, i):
         """
@@ -108,43 +171,42 @@ class LennardJones:
 
         return dr, distanceVector
 
+    def neighbors_par(self, r, i):
+        """
+        Find distance vectors, squared distances and types of all
+        particles within the cutoff of particle i, and the type of i
+        """
+        dr, distanceVectorSqrd = self.distance_vector_par(r, i)
+        types = self.get_types(r)
+        ti, tj = types[i], np.delete(types, i)
+        indices = np.nonzero(distanceVectorSqrd<self.cutoff2[ti, tj])
+        return dr[indices], distanceVectorSqrd[indices], ti, tj[indices]
+
     def eval_energy_par(self, r, i):
         """
         Evaluate potential energy of particle i
         """
-        _, distanceVector = self.distance_vector_par(r, i)
-        distancePowSixInv = distanceSqrd**(-3)
-        distancePowTwelveInv = distancePowSixInv**2
-        energy = np.sum(4 * (distancePowTwelveInv - distancePowSixInv - self.cutoff_corr))
-        return energy
+        _, distanceVectorSqrd, ti, tj = self.neighbors_par(r, i)
+        return np.sum(self.pair_energy(distanceVectorSqrd, ti, tj))
 
     def eval_acc_par(self, r, i):
         """
         Evaluate force on particle i
         """
-        dr, distanceVectorSqrd = self.distance_vector_par(r, i)
-        distancePowSixInv = distanceVectorSqrd**(-3)
-        distancePowTwelveInv = distancePowSixInv**2
-        
-        factor = np.divide(2 * distancePowTwelveInv - distancePowSixInv, distanceVectorSqrd)
-        factor[factor == np.inf] = 0
-        force = 24 * np.einsum('i,ij->ij', factor, dr)
-
-        return -np.sum(force, axis=0)
+        acc, _ = self.eval_acc_energy_par(r, i)
+        return acc
 
     def eval_acc_energy_par(self, r, i):
         """
         Evaluate force and energy on particle i
         """
-        dr, distanceVectorSqrd = self.distance_vector_par(r, i)
-        distancePowSixInv = distanceVectorSqrd**(-3)
-        distancePowTwelveInv = distancePowSixInv**2
-
-        energy = np.sum(4 * (distancePowTwelveInv - distancePowSixInv - self.cutoff_corr))
-        factor = np.divide(2 * distancePowTwelveInv - distancePowSixInv, distanceVectorSqrd)
-        force = 24 * np.einsum('i,ij->ij', factor, dr)
-
-        return -np.sum(force, axis=0), energy
+        dr, distanceVectorSqrd, ti, tj = self.neighbors_par(r, i)
+        factor, energy = self.pair_factor_energy(distanceVectorSqrd, ti, tj)
+        force = np.einsum('i,ij->ij', factor, dr)
+        acc = -np.sum(force, axis=0)
+        if self.particles is not None:
+            acc *= self.particles.invmass[i]
+        return acc, np.sum(energy)
 
 if __name__ == "__main__":
     r = np.random.random((10, 3))
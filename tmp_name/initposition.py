@@ -1,5 +1,4 @@
 from numpy import asarray, zeros
-from pandas import read_table
 from io import StringIO
 
 
@@ -111,6 +110,7 @@ class Restart(InitPosition):
     def read_xyz(self, xyzfile):
         """Read XYZ file and store contents in a Pandas DataFrame
         """
+        from pandas import read_table   # deferred, pandas is slow to import
         # first line contains number of atoms
         self.numatom = int(xyzfile.readline().split()[0])
         # second line contains a comment
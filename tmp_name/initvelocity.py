@@ -26,12 +26,14 @@ class SetVelocity(InitVelocity):
     def __init__(self, velocity):
         self.velocity = velocity
 
-    def __call__(self, shape):
+    def __call__(self, shape, mass=None):
         """ Get the velocity.
         Parameters
         ----------
         shape: tuple
             shape of position matrix (par, dim)
+        mass : array_like, optional
+            particle masses, not used
         Returns
         -------
         ndarray
@@ -48,12 +50,14 @@ class Zero(InitVelocity):
     def __init__(self):
         pass
 
-    def __call__(self, shape):
+    def __call__(self, shape, mass=None):
         """ Get the velocity.
         Parameters
         ----------
         shape: tuple
             shape of position matrix (par, dim)
+        mass : array_like, optional
+            particle masses, not used
         Returns
         -------
         ndarray
@@ -63,42 +67,141 @@ class Zero(InitVelocity):
 
 
 class Gauss(InitVelocity):
-    """ Gaussian distributed initial velocities.
+    """ Gaussian distributed initial velocities. The velocities are
+    drawn from a seeded generator directly into the output array, in
+    blocks of chunk particles if given.
     Parameters
     ----------
     mean : float
         mean value of Gaussian distribution
     var : float
-        variance of Gaussian distribution
+        standard deviation of Gaussian distribution
+    seed : int, optional
+        seed of random number generator
+    chunk : int, optional
+        number of particles generated at a time
     """
-    def __init__(self, mean, var):
+    def __init__(self, mean, var, seed=None, chunk=None):
         self.mean = mean
         self.var = var
+        self.rng = np.random.default_rng(seed)
+        self.chunk = chunk
 
-    def __call__(self, shape):
+    def blocks(self, npar):
+        """ Slices of at most chunk particles covering all particles
+        """
+        chunk = self.chunk or max(npar, 1)
+        for start in range(0, npar, chunk):
+            yield slice(start, min(start + chunk, npar))
+
+    def draw(self, out, mass):
+        """ Fill out with velocities of particles with masses mass,
+        which Gauss ignores
+        """
+        self.rng.standard_normal(out=out)
+        out *= self.var
+        out += self.mean
+
+    def __call__(self, shape, mass=None):
         """ Get the velocity.
         Parameters
         ----------
         shape: tuple
             shape of position matrix (par, dim)
+        mass : array_like, optional
+            particle masses, not used by Gauss, which draws all
+            velocities with the same variance. Subclasses such as
+            Temperature scale the velocities by the masses.
         Returns
         -------
         ndarray
             initial velocity configuration
         """
-        return np.random.normal(self.mean, self.var, size=shape)
+        mass = np.broadcast_to(1. if mass is None else mass, shape[:1])
+        velocity = np.empty(shape)
+        for rows in self.blocks(shape[0]):
+            self.draw(velocity[rows], mass[rows])
+        return velocity
 
 
 class Temperature(Gauss):
     """ Set the velocity to get a certain initial temperature
-    specified by T. Using the formula
-        T = <v>^2/ND
-    inversely.
+    specified by T. Velocities are drawn from the Maxwell-Boltzmann
+    distribution, the center-of-mass velocity is removed and the
+    velocities are rescaled such that
+        T = 2 K / N_f
+    holds exactly, where K is the kinetic energy and N_f = (N - 1) D
+    the number of degrees of freedom, as in the thermo output temp
+    (N D if momentum is kept). For very large systems, stream() yields
+    the velocities block by block without holding all of them in memory.
     Parameters
     ----------
     T : float
-        initial temperature given in Kelvin
+        initial temperature given in reduced units
+    seed : int, optional
+        seed of random number generator
+    chunk : int, optional
+        number of particles generated at a time
+    zero_momentum : bool
+        remove center-of-mass velocity
     """
-    def __init__(self, T):
-        self.mean = 0
-        self.var = np.sqrt(T)
+    def __init__(self, T, seed=None, chunk=None, zero_momentum=True):
+        super().__init__(0, np.sqrt(T), seed, chunk)
+        self.T = T
+        self.zero_momentum = zero_momentum
+
+    def draw(self, out, mass):
+        self.rng.standard_normal(out=out)
+        out *= np.sqrt(self.T / mass)[:, np.newaxis]
+
+    @staticmethod
+    def moments(v, mass):
+        """ Total mass, momentum and twice the kinetic energy
+        """
+        return np.sum(mass), mass @ v, np.einsum('i,ij,ij->', mass, v, v)
+
+    def correction(self, npar, ndim, M, P, K2):
+        """ Velocity shift and scaling factor giving zero momentum
+        and the exact temperature
+        """
+        dof = npar * ndim
+        shift = np.zeros(ndim)
+        if self.zero_momentum:
+            dof -= ndim
+            shift = P / M
+            K2 -= M * shift @ shift
+        scale = np.sqrt(dof * self.T / K2) if K2 > 0 else 0.
+        return shift, scale
+
+    def __call__(self, shape, mass=None):
+        velocity = super().__call__(shape, mass)
+        mass = np.broadcast_to(1. if mass is None else mass, shape[:1])
+        shift, scale = self.correction(*shape, *self.moments(velocity, mass))
+        velocity -= shift
+        velocity *= scale
+        return velocity
+
+    def stream(self, shape, mass=None):
+        """ Generate velocities in blocks of chunk particles. The
+        random numbers are drawn twice, first to find the correction
+        and then to yield the corrected blocks, so the result is equal
+        to that of __call__ with the same seed.
+        Yields
+        ------
+        slice, ndarray
+            particle indices and their velocities
+        """
+        mass = np.broadcast_to(1. if mass is None else mass, shape[:1])
+        state = self.rng.bit_generator.state
+        M, P, K2 = 0., np.zeros(shape[1]), 0.
+        for rows in self.blocks(shape[0]):
+            block = np.empty((rows.stop - rows.start, shape[1]))
+            self.draw(block, mass[rows])
+            M_, P_, K2_ = self.moments(block, mass[rows])
+            M, P, K2 = M + M_, P + P_, K2 + K2_
+        shift, scale = self.correction(*shape, M, P, K2)
+        self.rng.bit_generator.state = state
+        for rows in self.blocks(shape[0]):
+            block = np.empty((rows.stop - rows.start, shape[1]))
+            self.draw(block, mass[rows])
+            yield rows, (block - shift) * scale
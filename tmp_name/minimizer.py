@@ -0,0 +1,171 @@
+import numpy as np
+
+
+class Minimizer:
+    """
+    Energy minimizer base class. The minimization stops when the
+    largest force on a particle is below ftol, when the relative energy
+    change between two iterations is below etol, or after maxiter
+    iterations.
+
+    etol : float
+        relative energy tolerance, the energy criterion is not used if 0
+    ftol : float
+        force tolerance
+    maxiter : int
+        maximum number of iterations
+    """
+    def __init__(self, etol=0., ftol=1e-6, maxiter=10000):
+        self.etol = etol
+        self.ftol = ftol
+        self.maxiter = maxiter
+
+    def set_forcefield(self, forcefield):
+        self.forcefield = forcefield
+
+    def eval_force_energy(self, r):
+        """
+        Evaluate force, acceleration and energy, counting the
+        number of calls
+        """
+        a, u = self.forcefield.eval_acc_energy(r)
+        self.ncalls += 1
+        return a * self.mass[:, np.newaxis], a, u
+
+    def converged(self, u_old, u, f, energy=True):
+        """
+        Check stopping criteria, the energy criterion only if energy
+        is set
+        """
+        if (energy and self.etol > 0
+                and abs(u - u_old) <= self.etol * max(abs(u), abs(u_old), 1e-300)):
+            self.criterion = "energy"
+            return True
+        if np.max(np.einsum('ij,ij->i', f, f)) <= self.ftol**2:
+            self.criterion = "force"
+            return True
+        return False
+
+    def __call__(self, r, mass):
+        """
+        Minimize energy starting from positions r
+
+        Returns
+        -------
+        r, a, u
+            relaxed positions, accelerations and energy
+        """
+        self.ncalls = 0
+        self.niter = 0
+        self.criterion = "maxiter"
+        self.mass = mass
+        return self.minimize(np.array(r, dtype=float))
+
+
+class FIRE(Minimizer):
+    """
+    Fast inertial relaxation engine, Bitzek et al. (2006). Damped
+    dynamics where the velocity is steered along the force, with an
+    adaptive time step. Uses one force evaluation per iteration.
+
+    dt : float
+        initial time step
+    dtmax : float
+        largest time step
+    """
+    def __init__(self, dt=0.01, dtmax=0.1, nmin=5, finc=1.1, fdec=0.5,
+                 alpha=0.1, falpha=0.99, **kwargs):
+        super().__init__(**kwargs)
+        self.dt = dt
+        self.dtmax = dtmax
+        self.nmin = nmin
+        self.finc = finc
+        self.fdec = fdec
+        self.alpha0 = alpha
+        self.falpha = falpha
+
+    def minimize(self, r):
+        f, a, u = self.eval_force_energy(r)
+        v = np.zeros_like(r)
+        dt = self.dt
+        alpha = self.alpha0
+        npos = 0
+        reset = False
+        for self.niter in range(1, self.maxiter + 1):
+            # semi-implicit Euler step
+            v += a * dt
+            r += v * dt
+            u_old = u
+            f, a, u = self.eval_force_energy(r)
+            # the step after a reset is short, so the energy barely
+            # changes even far from the minimum
+            if self.converged(u_old, u, f, energy=not reset):
+                break
+
+            power = np.sum(f * v)
+            reset = power <= 0
+            if not reset:
+                vnorm = np.sqrt(np.sum(v * v))
+                fnorm = np.sqrt(np.sum(f * f))
+                v *= 1 - alpha
+                v += alpha * vnorm / fnorm * f
+                if npos > self.nmin:
+                    dt = min(dt * self.finc, self.dtmax)
+                    alpha *= self.falpha
+                npos += 1
+            else:
+                v[:] = 0
+                dt *= self.fdec
+                alpha = self.alpha0
+                npos = 0
+        return r, a, u
+
+
+class CG(Minimizer):
+    """
+    Nonlinear conjugate gradient minimizer with Polak-Ribiere update
+    and backtracking line search.
+
+    maxstep : float
+        largest displacement of a particle in the first trial step
+    """
+    def __init__(self, maxstep=0.1, **kwargs):
+        super().__init__(**kwargs)
+        self.maxstep = maxstep
+
+    def line_search(self, r, u, f, d):
+        """
+        Backtrack along d until the Armijo condition holds. The first
+        trial step is twice the previous accepted step, at most maxstep.
+        """
+        slope = np.sum(f * d)
+        dmax = np.sqrt(np.max(np.einsum('ij,ij->i', d, d)))
+        step = min(2 * self.step, self.maxstep) / dmax
+        while step * dmax > 1e-12:
+            r_new = r + step * d
+            f_new, a_new, u_new = self.eval_force_energy(r_new)
+            if u_new <= u - 1e-4 * step * slope:
+                self.step = step * dmax
+                return r_new, f_new, a_new, u_new
+            step *= 0.5
+        return r, f, None, u
+
+    def minimize(self, r):
+        f, a, u = self.eval_force_energy(r)
+        d = f.copy()
+        self.step = self.maxstep
+        for self.niter in range(1, self.maxiter + 1):
+            if np.sum(f * d) <= 0:
+                d = f.copy()      # restart along steepest descent
+            r, f_new, a_new, u_new = self.line_search(r, u, f, d)
+            if a_new is None:
+                self.criterion = "linesearch"
+                break
+            u_old, u, a = u, u_new, a_new
+            if self.converged(u_old, u, f_new):
+                f = f_new
+                break
+            beta = max(0, np.sum(f_new * (f_new - f)) / np.sum(f * f))
+            d = f_new + beta * d
+            f = f_new
+        return r, a, u
@@ -1,13 +1,34 @@
 import numpy as np
+from math import gamma, pi
 
 
 class Moves:
+    """
+    Move base class. Moves whose acceptance depends on the change in
+    force on the moved particle set needs_force, otherwise the sampler
+    only evaluates the energy. Moves that insert, delete or relocate
+    whole particles set swap and implement propose_swap instead of
+    propose_move.
+    """
+    needs_force = False
+    swap = False
+    mu = 0.
+
     def __init__(self):
         pass
 
     def __call__(self, ai):
         pass
 
+    def tune(self, rate, target):
+        """
+        Scale the step size dx toward the target acceptance rate,
+        by at most a factor of two. Moves without a step size are
+        left unchanged.
+        """
+        if hasattr(self, 'dx'):
+            self.dx *= np.clip(rate / target, 0.5, 2.)
+
 
 class Trans(Moves):
     """
@@ -32,6 +53,7 @@ class TransMH(Moves):
     """
     Translational move using the Metropolis-Hastings method
     """
+    needs_force = True
 
     def __init__(self, dx=0.01, Ddt = 0.01):
         self.dx = dx
@@ -48,25 +70,186 @@ class TransMH(Moves):
         return np.exp(0.5 * da.dot(self.eps)) + 1
 
 
-class AVBMCIntraSwap(Moves):
+class SwapMoves(Moves):
     """
-    Aggregate-volume biased Monte Carlo (AVBMC) intra swap
-    move to be performed in canonical ensemble. See
-    Chen and Siepmann.
+    Base class for moves inserting, deleting or relocating particles.
+    propose_swap returns (dn, i, ri): the change in number of particles,
+    the particle to delete or relocate and its new position. i is None
+    if no valid move could be proposed. The box is [0, box) in every
+    direction.
+    """
+    swap = True
+
+    def __init__(self, box, mu=0.):
+        self.box = np.asarray(box, dtype=float)
+        self.mu = mu
+
+    def volume(self, ndim):
+        return np.prod(np.broadcast_to(self.box, (ndim,)))
+
+    def random_position(self, ndim):
+        return np.random.random(ndim) * self.box
+
+    def accept(self, da):
+        """
+        Returns the transition probability ratio, e.i.,
+        Tji/Tij
+        """
+        return self.ratio
+
+
+class GCMCSwap(SwapMoves):
+    """
+    Grand-canonical insertion or deletion of a particle, with equal
+    probability. Particles are inserted uniformly in the box.
+
+    box : float or array_like
+        length of box in each direction
+    mu : float
+        chemical potential
     """
+    def propose_swap(self, r):
+        npar, ndim = r.shape
+        volume = self.volume(ndim)
+        if np.random.random() < 0.5:
+            self.ratio = volume / (npar + 1)
+            return 1, None, self.random_position(ndim)
+        if npar == 0:
+            return -1, None, None
+        self.ratio = npar / volume
+        return -1, np.random.randint(npar), None
+
 
-    def __init__(self, r_below, r_above):
+class AVBMC(SwapMoves):
+    """
+    Base class for aggregate-volume biased Monte Carlo (AVBMC) moves,
+    see Chen and Siepmann (2000). The bonded region of a target particle
+    is the shell r_below < |r - r_target| < r_above.
+    """
+    def __init__(self, r_below, r_above, box, mu=0.):
+        super().__init__(box, mu)
         self.r_below = r_below
         self.r_above = r_above
 
-    def propose_move(self, ai):
-        return
+    def volume_in(self, ndim):
+        """
+        Volume of bonded region
+        """
+        unit = pi**(ndim / 2) / gamma(ndim / 2 + 1)
+        return unit * (self.r_above**ndim - self.r_below**ndim)
+
+    def bonded(self, r, j):
+        """
+        Mask of particles in the bonded region of particle j
+        """
+        dr = r - r[j]
+        distanceSqrd = np.einsum('ij,ij->i', dr, dr)
+        mask = (distanceSqrd > self.r_below**2) & (distanceSqrd < self.r_above**2)
+        mask[j] = False
+        return mask
+
+    def position_in(self, r, j):
+        """
+        Draw position uniformly in the bonded region of particle j
+        """
+        ndim = r.shape[1]
+        direction = np.random.normal(size=ndim)
+        direction /= np.linalg.norm(direction)
+        length = (np.random.random() * (self.r_above**ndim - self.r_below**ndim)
+                  + self.r_below**ndim)**(1 / ndim)
+        return r[j] + length * direction
+
+    def position_out(self, r, j):
+        """
+        Draw position uniformly in the box, outside the bonded region
+        of particle j
+        """
+        ndim = r.shape[1]
+        while True:
+            ri = self.random_position(ndim)
+            distanceSqrd = np.sum((ri - r[j])**2)
+            if not self.r_below**2 < distanceSqrd < self.r_above**2:
+                return ri
+
 
-class AVBMCInterSwap(Moves):
+class AVBMCIntraSwap(AVBMC):
     """
+    Aggregate-volume biased Monte Carlo (AVBMC) intra swap
+    move to be performed in canonical ensemble. See
+    Chen and Siepmann. A random particle is moved into the bonded
+    region of a random target particle with probability p_bias, or
+    out of it otherwise.
 
+    r_below, r_above : float
+        inner and outer radius of bonded region
+    box : float or array_like
+        length of box in each direction
+    p_bias : float
+        probability of moving a particle into the bonded region
     """
-    pass
+    def __init__(self, r_below, r_above, box, p_bias=0.5):
+        super().__init__(r_below, r_above, box)
+        self.p_bias = p_bias
+
+    def propose_swap(self, r):
+        npar, ndim = r.shape
+        if npar < 2:
+            return 0, None, None
+        j = np.random.randint(npar)
+        bonded = self.bonded(r, j)
+        bonded_idx = np.nonzero(bonded)[0]
+        nin = len(bonded_idx)
+        nout = npar - 1 - nin
+        vin = self.volume_in(ndim)
+        vout = self.volume(ndim) - vin
+        if np.random.random() < self.p_bias:
+            # move a particle from outside into the bonded region
+            if nout == 0:
+                return 0, None, None
+            outside = np.nonzero(~bonded)[0]
+            i = np.random.choice(outside[outside != j])
+            self.ratio = ((1 - self.p_bias) * vin * nout
+                          / (self.p_bias * vout * (nin + 1)))
+            return 0, i, self.position_in(r, j)
+        # move a particle from the bonded region to outside
+        if nin == 0:
+            return 0, None, None
+        i = np.random.choice(bonded_idx)
+        self.ratio = (self.p_bias * vout * nin
+                      / ((1 - self.p_bias) * vin * (nout + 1)))
+        return 0, i, self.position_out(r, j)
+
+
+class AVBMCInterSwap(AVBMC):
+    """
+    Aggregate-volume biased Monte Carlo (AVBMC) insertion or deletion
+    move to be performed in grand-canonical ensemble. A particle is
+    inserted in the bonded region of a random target particle, or a
+    random particle is deleted from it, with equal probability.
+
+    r_below, r_above : float
+        inner and outer radius of bonded region
+    box : float or array_like
+        length of box in each direction
+    mu : float
+        chemical potential
+    """
+    def propose_swap(self, r):
+        npar, ndim = r.shape
+        if npar == 0:
+            return 0, None, None
+        j = np.random.randint(npar)
+        bonded_idx = np.nonzero(self.bonded(r, j))[0]
+        nin = len(bonded_idx)
+        vin = self.volume_in(ndim)
+        if np.random.random() < 0.5:
+            self.ratio = npar * vin / ((npar + 1) * (nin + 1))
+            return 1, None, self.position_in(r, j)
+        if nin == 0 or npar < 2:
+            return -1, None, None
+        self.ratio = npar * nin / ((npar - 1) * vin)
+        return -1, np.random.choice(bonded_idx), None
+
 
 class EBAVBMCIntraSwap(Moves):
     """
@@ -0,0 +1,131 @@
+import numpy as np
+
+
+class Particles:
+    """
+    Particle store for a variable number of particles. Per-particle
+    arrays live in buffers with spare capacity, so that inserting a
+    particle is amortized O(1) (the capacity is doubled when full) and
+    deleting a particle is O(1) (the last particle is moved into its
+    place). The attributes r, v, a, types, mass and invmass are views
+    of the first npar rows. invmass has shape (npar, 1), so that it
+    broadcasts against forces.
+
+    r : ndarray
+        initial positions, shape (npar, ndim)
+    v : ndarray
+        initial velocities, shape (npar, ndim)
+    """
+    def __init__(self, r, v):
+        r = np.asarray(r, dtype=float)
+        self.npar, self.ndim = r.shape
+        self.capacity = max(self.npar, 1)
+        self.buffers = {}
+        self.defaults = {}
+        self.type_masses = None
+        self.add_array('r', r)
+        self.add_array('v', v)
+        self.add_array('a', np.zeros_like(r))
+        self.add_array('types', np.zeros(self.npar, dtype=int))
+        self.add_array('mass', np.ones(self.npar), default=1.)
+        self.add_array('invmass', np.ones((self.npar, 1)), default=1.)
+
+    def add_array(self, name, array, default=0):
+        """
+        Store another per-particle array
+
+        name : str
+            name of array, accessible as attribute
+        array : array_like
+            per-particle values, first dimension is npar
+        default : scalar
+            value of new particles
+        """
+        array = np.asarray(array)
+        buffer = np.zeros((self.capacity,) + array.shape[1:], dtype=array.dtype)
+        buffer[:self.npar] = array
+        self.buffers[name] = buffer
+        self.defaults[name] = default
+
+    def set_masses(self, masses, by_type=False):
+        """
+        Set particle masses and their inverse
+
+        masses : float or array_like
+            mass of all particles, of every particle or of every type
+        by_type : bool
+            masses are given per type, also used for inserted particles
+        """
+        masses = np.asarray(masses, dtype=float)
+        if by_type:
+            self.type_masses = masses
+            masses = masses[self.types]
+        else:
+            self.type_masses = None
+        self.buffers['mass'][:self.npar] = masses
+        self.buffers['invmass'][:self.npar, 0] = 1 / self.mass
+
+    def __getattr__(self, name):
+        try:
+            buffers = self.__dict__['buffers']
+            return buffers[name][:self.__dict__['npar']]
+        except KeyError:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'") from None
+
+    def set(self, name, array):
+        """
+        Overwrite a per-particle array. If the number of particles
+        differs from the stored one, all other arrays are resized.
+        """
+        array = np.asarray(array)
+        if len(array) != self.npar:
+            self.resize(len(array))
+        self.buffers[name][:self.npar] = array
+
+    def resize(self, npar):
+        """
+        Set the number of particles, new particles get default values
+        """
+        while npar > self.capacity:
+            self.grow()
+        for name, buffer in self.buffers.items():
+            buffer[self.npar:npar] = self.defaults[name]
+        self.npar = npar
+
+    def grow(self):
+        """
+        Double the capacity of all buffers
+        """
+        self.capacity *= 2
+        for name, buffer in self.buffers.items():
+            new = np.zeros((self.capacity,) + buffer.shape[1:], dtype=buffer.dtype)
+            new[:self.npar] = buffer[:self.npar]
+            self.buffers[name] = new
+
+    def insert(self, **values):
+        """
+        Append a particle, unspecified arrays get default values, and
+        the mass follows the type if masses are set by type. Returns
+        the index of the new particle.
+        """
+        if self.npar == self.capacity:
+            self.grow()
+        i = self.npar
+        for name, buffer in self.buffers.items():
+            buffer[i] = values.get(name, self.defaults[name])
+        if self.type_masses is not None and 'mass' not in values:
+            mass = self.type_masses[self.buffers['types'][i]]
+            self.buffers['mass'][i] = mass
+            self.buffers['invmass'][i] = 1 / mass
+        self.npar += 1
+        return i
+
+    def delete(self, i):
+        """
+        Delete particle i by moving the last particle into its place
+        """
+        last = self.npar - 1
+        if i != last:
+            for buffer in self.buffers.values():
+                buffer[i] = buffer[last]
+        self.npar = last
@@ -0,0 +1,57 @@
+import sys
+import json
+from time import perf_counter
+
+
+class Progress:
+    """
+    Progress report for headless runs (batch jobs), replacing the
+    progress bar. A status line is written to stream at most every
+    interval seconds, and thermo output and a summary with the
+    measured steps per second are written to file as JSON lines.
+
+    total : int
+        number of steps of the run
+    file : str
+        structured log file, appended to
+    interval : float
+        shortest time between status lines in seconds. The run is
+        split into stretches of about this length (see
+        TmpName.stretches), so that lines are written this often even
+        if no output is due.
+    """
+    def __init__(self, total, file, interval=0.25, stream=sys.stderr):
+        self.total = total
+        self.interval = interval
+        self.stream = stream
+        self.f = open(file, 'a')
+        self.n = 0
+        self.t_start = self.t_last = perf_counter()
+        self.record(event="start", steps=total)
+
+    def record(self, **fields):
+        """
+        Write a record to the log
+        """
+        fields["wall"] = round(perf_counter() - self.t_start, 6)
+        self.f.write(json.dumps(fields) + "\n")
+
+    def update(self, n):
+        self.n += n
+        now = perf_counter()
+        if now - self.t_last >= self.interval:
+            self.t_last = now
+            rate = self.n / (now - self.t_start)
+            self.stream.write(f"{self.n}/{self.total} steps ({100 * self.n / self.total:.0f}%), "
+                              f"{rate:.1f} steps/s\n")
+
+    def close(self):
+        """
+        Write summary and close the log, returns steps per second
+        """
+        elapsed = perf_counter() - self.t_start
+        rate = self.n / elapsed if elapsed > 0 else float("inf")
+        self.record(event="end", steps=self.n, seconds=elapsed, steps_per_second=rate)
+        self.f.close()
+        self.stream.write(f"Ran {self.n} steps in {elapsed:.3f} s ({rate:.1f} steps/s)\n")
+        return rate
@@ -4,40 +4,113 @@ class Sampler:
     """
     Sampler base class
     """
-    def __init__(self, stillinger_lim=np.inf):
+    def __init__(self, stillinger_lim=np.inf, temp=1.):
         self.stillinger_lim = stillinger_lim
+        self.temp = temp
+        self.cluster = None
 
     def set_forcefield(self, forcefield):
         self.forcefield = forcefield
 
+    def set_cluster(self, cluster):
+        """
+        Set cluster object used to enforce the Stillinger criterion
+
+        cluster : obj
+            Cluster object from tmp_name.cluster, or None
+        """
+        self.cluster = cluster
+
+    def eval_par(self, r, i, move):
+        """
+        Evaluate what the move needs to be accepted or rejected:
+        force and energy of particle i, or just the energy
+        """
+        if move.needs_force:
+            return self.forcefield.eval_acc_energy_par(r, i)
+        return None, self.forcefield.eval_energy_par(r, i)
+
     def propose_move(self, r, move):
         """
         Propose new move among the available types of moves
         """
         i = np.random.randint(len(r))  # which particle to move
-        ai, ui = self.forcefield.eval_acc_energy_par(r, i)
-        ri = r[i]
+        ai, ui = self.eval_par(r, i, move)
+        self.i = i
+        self.dn = 0
+        self.ri = r[i].copy()
         r[i] += move.propose_move(ai)  # self.get_dr(ai)
 
-        # Stillinger cluster criterion
-        _, dd = self.forcefield.distance_vector_par(r, i)
-        if np.min(dd) > self.stillinger_lim:  # remove particle from cluster
-            r = np.delete(r, i, 0)
-            self.da = np.zeros(3)
+        # Stillinger cluster criterion, moves splitting a cluster are rejected
+        self.violation = self.cluster is not None and self.cluster.breaks(r, i, self.ri)
+        if self.violation:
+            self.da = None
             self.du = 0
         else:
-            ai_new, ui_new = self.forcefield.eval_acc_energy_par(r, i)
-            self.da = ai_new - ai
+            ai_new, ui_new = self.eval_par(r, i, move)
+            self.da = None if ai is None else ai_new - ai
             self.du = ui_new - ui
         return r
 
+    def propose_swap(self, particles, move):
+        """
+        Propose a move inserting, deleting or relocating a particle.
+        Insertions are applied right away, deletions when accepted.
+        Insertions of particles without bonds and deletions splitting
+        a cluster violate the Stillinger criterion.
+        """
+        r = particles.r
+        self.dn, i, ri = move.propose_swap(r)
+        self.da = None
+        self.du = 0
+        self.violation = False
+        if self.dn == 0 and i is not None:
+            self.i = i
+            self.ri = r[i].copy()
+            ui = self.forcefield.eval_energy_par(r, i)
+            r[i] = ri
+            self.violation = self.cluster is not None and self.cluster.breaks(r, i, self.ri)
+            self.du = self.forcefield.eval_energy_par(r, i) - ui
+        elif self.dn == 1:
+            self.i = particles.insert(r=ri)
+            self.violation = self.cluster is not None and self.cluster.isolates(particles.r, self.i)
+            self.du = self.forcefield.eval_energy_par(particles.r, self.i)
+        elif self.dn == -1 and i is not None:
+            self.i = i
+            self.violation = self.cluster is not None and self.cluster.breaks(r, i, delete=True)
+            self.du = -self.forcefield.eval_energy_par(r, i)
+        else:
+            # no valid move could be proposed
+            self.dn = 0
+            self.i = None
+            self.violation = True
+
+    def apply_move(self, particles):
+        """
+        Finish accepted move
+        """
+        if self.dn == -1:
+            particles.delete(self.i)
+
+    def reject_move(self, particles):
+        """
+        Undo rejected move, moving the particle back to where it was
+        before the move or removing an inserted particle
+        """
+        if self.dn == 1:
+            particles.delete(self.i)
+        elif self.dn == 0 and self.i is not None:
+            particles.r[self.i] = self.ri
+
     def accept_move(self, move):
         """
         Decide if move should be accepted or
         rejected
         """
+        if self.violation:
+            return False
         p = self.get_acceptance_prob(move)
-        if p > np.random.normal():
+        if p > np.random.random():
             return True
         return False
 
@@ -50,48 +123,91 @@ class Metropolis(Sampler):
         super().__init__(**kwargs)
 
     def get_acceptance_prob(self, move):
-        return move.accept(self.da) * np.exp(self.du)
+        return move.accept(self.da) * np.exp(-(self.du - self.dn * move.mu) / self.temp)
 
 
 class Umbrella(Sampler):
     """
-    Umbrella Sampling, like proposed by Torrie and Valleau (1977)
-
-    L : int
-        number of windows in each direction (L**3 windows)
-    psi : func { ndarray, int }
-        bias functions, Gaussian by default
-        
+    Umbrella Sampling, like proposed by Torrie and Valleau (1977).
+    Samples a single window, biased by a harmonic potential in a
+    collective variable. The histogram of the collective variable is
+    written to file every freq samples, see tmp_name.umbrella for
+    running several windows in parallel and combining them.
+
+    cv : func { ndarray }
+        collective variable of a configuration
+    center : float
+        center of window
+    k : float
+        spring constant of bias
+    bins : array_like
+        bin edges of histogram
+    file : str
+        histogram file (.npz), not written if None
+    freq : int
+        number of samples between every write
     """
-    def __init__(self, L, psi=None, **kwargs):
+    def __init__(self, cv, center, k, bins, file=None, freq=1000, **kwargs):
         super().__init__(**kwargs)
+        self.cv = cv
+        self.center = center
+        self.k = k
+        self.bins = np.asarray(bins, dtype=float)
+        self.counts = np.zeros(len(self.bins) - 1, dtype=int)
+        self.file = file
+        self.freq = freq
+        self.nsamples = 0
+        self.cv_old = None
+
+    def psi(self, x):
+        """
+        Define bias function (umbrella) as a harmonic potential
+        """
+        return 0.5 * self.k * (x - self.center)**2
 
-        self.L = L
-        c_1d = np.linspace(0, 1, L)
-        c_3d = np.meshgrid(c_1d, c_1d, c_1d)
-        self.cs = np.vstack(map(np.ravel, c_3d))
-        self.k = L - 1
+    def propose_move(self, r, move):
+        if self.cv_old is None:
+            self.cv_old = self.cv(r)
+        r = super().propose_move(r, move)
+        if not self.violation:
+            self.cv_new = self.cv(r)
+        return r
 
-        if psi is None:
-            self.psi = self.gauss
+    def propose_swap(self, particles, move):
+        if self.cv_old is None:
+            self.cv_old = self.cv(particles.r)
+        super().propose_swap(particles, move)
+        if self.violation:
+            pass
+        elif self.dn == -1:
+            self.cv_new = self.cv(np.delete(particles.r, self.i, 0))
         else:
-            self.psi = psi
+            self.cv_new = self.cv(particles.r)
+
+    def get_acceptance_prob(self, move):
+        dw = self.psi(self.cv_new) - self.psi(self.cv_old)
+        return move.accept(self.da) * np.exp(-(self.du + dw - self.dn * move.mu) / self.temp)
 
-    def gauss(self, r, i):
+    def accept_move(self, move):
         """
-        Define bias functions (umbrellas) as Gaussians
+        Decide if move should be accepted or rejected,
+        and add the resulting configuration to histogram
         """
-        sigma = (r - np.min(r)) / np.max(r)  # shift r to (0, 1)
-        return np.exp(-self.k**2 * (sigma - self.cs[i])**2 / 2.)
-
-    def get_normalization_constants(self, Fij):
+        accept = super().accept_move(move)
+        if accept:
+            self.cv_old = self.cv_new
+        b = np.searchsorted(self.bins, self.cv_old, side='right') - 1
+        if 0 <= b < len(self.counts):
+            self.counts[b] += 1
+        self.nsamples += 1
+        if self.file is not None and self.nsamples % self.freq == 0:
+            self.write_histogram()
+        return accept
+
+    def write_histogram(self):
         """
-        Get normalization of bias functions using the overlap
-        matrix. The overlap matrix has to be obtained during
-        sampling.
+        Write histogram, collected so far, to file
         """
-        return np.ones(self.L)
-
-    def get_acceptance(self, move):
-        return move.accept(self.da) * np.exp(self.du)
-
+        with open(self.file, 'wb') as f:
+            np.savez(f, bins=self.bins, counts=self.counts,
+                     center=self.center, k=self.k, temp=self.temp)
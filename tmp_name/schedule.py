@@ -0,0 +1,59 @@
+import numpy as np
+
+
+class Hook:
+    """
+    Function called with the solver as argument at every step that
+    is a multiple of freq. With an infinite freq, it is only called
+    at step 0.
+    """
+    def __init__(self, func, freq):
+        self.func = func
+        self.freq = freq
+
+    def next(self, t):
+        """
+        First step from t on where the hook fires
+        """
+        if not np.isfinite(self.freq):
+            return 0 if t <= 0 else np.inf
+        return -(-t // self.freq) * self.freq
+
+
+class Scheduler:
+    """
+    Keeps track of hooks (outputs, analyses, thermostats etc.) and the
+    next step where any of them fires, so that the integration can run
+    uninterrupted between those steps.
+    """
+    def __init__(self, hooks=()):
+        self.hooks = list(hooks)
+
+    def add(self, func, freq):
+        """
+        Register func(solver), called every freq steps
+        """
+        hook = Hook(func, freq)
+        self.hooks.append(hook)
+        return hook
+
+    def remove(self, hook):
+        self.hooks.remove(hook)
+
+    def next_event(self, t):
+        """
+        First step from t on where any hook fires
+        """
+        return min((hook.next(t) for hook in self.hooks), default=np.inf)
+
+    def fire(self, solver):
+        """
+        Call all hooks that are due at the current step, in the
+        order they were registered
+        """
+        for hook in self.hooks:
+            if hook.next(solver.t) == solver.t:
+                hook.func(solver)
+
+    def freqs(self):
+        return [hook.freq for hook in self.hooks]
@@ -1,10 +1,12 @@
 import re
+import numpy as np
 
 
 class Thermo:
     def __init__(self, freq, file, quantities):
         self.freq = freq
         self.quantities = quantities
+        self.last = {}      # quantities of last output
         self.f = open(file, 'w')
         self.make_header()
 
@@ -17,15 +19,25 @@ class Thermo:
     def write_header(self):
         print("\n" + self.header)
 
-    def collect_data(self, solver, quantities):
-        string = ""
+    def values(self, solver, quantities):
+        """
+        Evaluate quantities, returning a dict of floats
+        """
+        values = {}
         for quantity in quantities:
             if "[" in quantity:
                 label = quantity.split('[')[0]
                 indices = re.findall(r"(?<!\.)\d+(?!\.)", quantity)
-                string += "{:<12.3f}".format(getattr(self, label)(solver, *tuple(map(int, indices))))
+                values[quantity] = float(getattr(self, label)(solver, *tuple(map(int, indices))))
             else:
-                string += "{:<12.3f}".format(getattr(self, quantity)(solver))
+                values[quantity] = float(getattr(self, quantity)(solver))
+        return values
+
+    def collect_data(self, solver, quantities):
+        self.last = self.values(solver, quantities)
+        string = ""
+        for value in self.last.values():
+            string += "{:<12.3f}".format(value)
         return string
 
     def __call__(self, solver):
@@ -49,7 +61,9 @@ class Thermo:
 
     @staticmethod
     def temp(solver):
-        return (solver.v**2).sum() / (solver.npar * solver.ndim)
+        # the momentum is conserved, which removes ndim degrees of freedom
+        dof = max(solver.npar - 1, 1) * solver.ndim
+        return 2 * Thermo.kineng(solver) / dof
 
     @staticmethod
     def poteng(solver):
@@ -57,7 +71,7 @@ class Thermo:
 
     @staticmethod
     def kineng(solver):
-        return (solver.v**2).sum()/2
+        return np.einsum('i,ij,ij->', solver.mass, solver.v, solver.v) / 2
 
     """
     @staticmethod
@@ -87,9 +101,31 @@ class Thermo:
     def a(solver, i, j):
         return solver.a[i, j]
 
+    @staticmethod
+    def nclusters(solver):
+        return len(solver.get_cluster().sizes(solver.r))
+
+    @staticmethod
+    def maxcluster(solver):
+        return solver.get_cluster().sizes(solver.r)[0]
+
+    @staticmethod
+    def cluster(solver, i):
+        sizes = solver.get_cluster().sizes(solver.r)
+        return sizes[i] if i < len(sizes) else 0
+
     @staticmethod
     def acc_ratio(solver):
         return solver.acc_ratio
 
+    @staticmethod
+    def acc_move(solver, i):
+        attempted, accepted = solver.move_stats[i]
+        return accepted / max(attempted, 1)
+
+    @staticmethod
+    def dx(solver, i):
+        return getattr(solver.moves[i], 'dx', np.nan)     # swap moves have no step size
+
     def __del__(self):
         self.f.close()
@@ -0,0 +1,127 @@
+import numpy as np
+from pathlib import Path
+from multiprocessing import Pool
+
+from .sampler import Umbrella
+
+
+def run_window(setup, cv, center, k, bins, steps, file, temp=1., freq=1000):
+    """
+    Run a single umbrella sampling window and write its histogram
+
+    setup : func { int }
+        returns a TmpName object with moves added, given window center
+    """
+    solver = setup(center)
+    sampler = Umbrella(cv, center, k, bins, file=file, freq=freq, temp=temp)
+    solver.set_sampler(sampler)
+    solver.run_mc(steps, out="no")
+    sampler.write_histogram()
+    return file
+
+
+def run_umbrella(setup, cv, centers, k, bins, steps, dir, temp=1.,
+                 freq=1000, processes=None):
+    """
+    Run umbrella sampling windows in parallel worker processes and
+    combine the histograms using WHAM. setup and cv are sent to the
+    workers, so they have to be picklable (module level functions).
+
+    setup : func { float }
+        returns a TmpName object with moves added, given window center
+    cv : func { ndarray }
+        collective variable of a configuration
+    centers : array_like
+        window centers
+    k : float
+        spring constant of bias
+    bins : array_like
+        bin edges of histograms
+    steps : int
+        number of Monte Carlo steps per window
+    dir : str
+        directory of histogram files
+    processes : int
+        number of worker processes, number of cores by default
+
+    Returns
+    -------
+    ndarray
+        bin centers
+    ndarray
+        free energy profile
+    """
+    p = Path(dir)
+    p.mkdir(parents=True, exist_ok=True)
+    jobs = [(setup, cv, center, k, bins, steps, str(p / f"window_{i}.npz"), temp, freq)
+            for i, center in enumerate(centers)]
+    with Pool(processes) as pool:
+        files = pool.starmap(run_window, jobs)
+    return wham(*load_histograms(files))
+
+
+def load_histograms(files):
+    """
+    Load window histograms written by the Umbrella sampler
+
+    Returns
+    -------
+    bins, counts, centers, k, temp
+    """
+    data = [np.load(file) for file in files]
+    bins = data[0]['bins']
+    counts = np.array([d['counts'] for d in data])
+    centers = np.array([d['center'] for d in data])
+    k = np.array([d['k'] for d in data])
+    return bins, counts, centers, k, float(data[0]['temp'])
+
+
+def logsumexp(a, axis):
+    amax = np.max(a, axis=axis, keepdims=True)
+    amax[~np.isfinite(amax)] = 0
+    return np.log(np.sum(np.exp(a - amax), axis=axis)) + np.squeeze(amax, axis=axis)
+
+
+def wham(bins, counts, centers, k, temp=1., tol=1e-7, maxiter=100000):
+    """
+    Weighted histogram analysis method (WHAM) for harmonic windows,
+    iterating the self-consistent equations in log space over all
+    windows and bins at once.
+
+    bins : ndarray
+        bin edges, shape (nbins+1,)
+    counts : ndarray
+        histogram of every window, shape (nwindows, nbins)
+    centers : ndarray
+        window centers, shape (nwindows,)
+    k : float or ndarray
+        spring constant of every window
+
+    Returns
+    -------
+    ndarray
+        bin centers
+    ndarray
+        free energy profile, zero at its minimum (inf in empty bins)
+    """
+    beta = 1 / temp
+    x = (bins[1:] + bins[:-1]) / 2
+    k = np.broadcast_to(k, np.shape(centers))
+    bias = 0.5 * k[:, np.newaxis] * (x[np.newaxis, :] - centers[:, np.newaxis])**2
+    nsamples = counts.sum(axis=1)
+    with np.errstate(divide='ignore'):
+        lognum = np.log(counts.sum(axis=0))
+        lognsamples = np.log(nsamples)[:, np.newaxis]
+
+    f = np.zeros(len(centers))
+    for _ in range(maxiter):
+        logden = logsumexp(lognsamples - beta * (bias - f[:, np.newaxis]), axis=0)
+        logp = lognum - logden
+        f_new = -logsumexp(logp[np.newaxis, :] - beta * bias, axis=1) / beta
+        f_new -= f_new[0]
+        if np.max(np.abs(f_new - f)) < tol:
+            f = f_new
+            break
+        f = f_new
+    free = -logp / beta
+    return x, free - np.min(free)